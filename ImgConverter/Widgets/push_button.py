@@ -11,6 +11,7 @@ import slate_handler as slate
 import converter_constants as constants
 import file_handler as handler
 import ffmpeg_handler as ffmpeg
+import job_runner
 from HANLib import init_logger
 
 # Set Logger
@@ -40,6 +41,7 @@ class ButtonEventHandler(ConverterUi):
     def __init__(self, run_paths=None):
         super().__init__(run_paths)
         
+        self.job_queue = None
         self.connect_buttons()
 
     def connect_buttons(self):
@@ -51,6 +53,7 @@ class ButtonEventHandler(ConverterUi):
         self.remove_btn.clicked.connect(self.remove_selected)
         self.save_dir_btn.clicked.connect(self.select_save_directory)
         self.convert_btn.clicked.connect(self.convert_images)
+        self.cancel_btn.clicked.connect(self.cancel_conversion)
         self.slate_btn.clicked.connect(lambda: self.open_slate_settings(self.clicked_file_path))
 
     def open_slate_settings(self, file_path):
@@ -91,7 +94,7 @@ class ButtonEventHandler(ConverterUi):
         self.file_tree.move_selected(1)
 
     def sort_by_name(self):
-        self.file_tree.sortItems(1, Qt.AscendingOrder)
+        self.file_tree.sortByColumn(1, Qt.AscendingOrder)
 
     def remove_selected(self):
         if not self.file_tree.selectedIndexes():
@@ -120,13 +123,14 @@ class ButtonEventHandler(ConverterUi):
 
         self.save_path_le.setText(save_path)
 
-    def _get_output_path(self):
+    def _get_output_path(self, checked_items=None):
 
         output_format = self.output_format_cb.currentText()
-        checked_items = self.file_tree.get_checked_items()
-        seq_paths, non_seq_paths = handler.parse_path_by_type(checked_items)
+        if checked_items is None:
+            checked_items = self.file_tree.get_checked_items()
+        sequences, non_seq_paths = handler.parse_path_by_type(checked_items)
 
-        if not seq_paths and not non_seq_paths:
+        if not sequences and not non_seq_paths:
             LOGGER.warning(
                 "No items selected or when there is an none-sequence file in sequence folder."
             )
@@ -135,31 +139,18 @@ class ButtonEventHandler(ConverterUi):
             )
             return None
 
-        if output_format in constants.OUTPUT_VIDEO_FORMAT:
-            if seq_paths and non_seq_paths or (seq_paths and not non_seq_paths):
-                first_file_name = Path(seq_paths[0]).stem.split(".")[0]
-                dir = Path(seq_paths[0]).parent
-                output_path = str(dir / f"{first_file_name}.{output_format}")
-
-            elif non_seq_paths:
-                first_file_name = Path(non_seq_paths[0]).stem
-                dir = Path(non_seq_paths[0]).parent
-                output_path = str(dir / f"{first_file_name}.{output_format}")
-
-        elif output_format in constants.OUTPUT_IMAGE_FORMAT:
-            if seq_paths:
-                padding_full_path = handler.get_padding_path(seq_paths, output_format)
-                output_path = padding_full_path
-            elif non_seq_paths:
-                padding_full_path = handler.get_padding_path(
-                    non_seq_paths, output_format, frame_padding=4
-                )
-                output_path = padding_full_path
-        else:
-            output_path = ""
-
-        return output_path
+        return ffmpeg.get_default_output_path(output_format, sequences, non_seq_paths)
     
+    def _get_layer(self, checked_items):
+        # The layer is picked per item, one job can only read one of them.
+        layers = {entry.get("layer") for entry in checked_items.values()}
+        if len(layers) > 1:
+            raise ffmpeg.ConversionError(
+                "The checked items use different EXR layers. "
+                "Enable separate jobs or pick the same layer."
+            )
+        return layers.pop() if layers else None
+
     def convert_images(self):
 
         reply = QMessageBox.information(
@@ -192,14 +183,154 @@ class ButtonEventHandler(ConverterUi):
         LOGGER.info(f"Checked Items: {checked_items}")
 
 
-        converted = ffmpeg.run_conversion(
-            save_path, output_format, checked_items, frame_rate=frame_rate, 
-            codec=codec, resize=resize
+        if self.separate_jobs_chb.isChecked():
+            jobs, errors = self.build_separate_jobs(
+                save_path, output_format, checked_items, frame_rate, codec, resize
+            )
+        else:
+            jobs, errors = [], []
+            try:
+                jobs.append(ffmpeg.build_conversion(
+                    save_path, output_format, checked_items, frame_rate=frame_rate, 
+                    codec=codec, resize=resize, max_segments=self._get_max_segments(1),
+                    raw_feed=self.raw_feed_chb.isChecked(),
+                    native=self.native_image_chb.isChecked(),
+                    layer=self._get_layer(checked_items)
+                ))
+            except ffmpeg.ConversionError as e:
+                errors.append(str(e))
+
+        if errors:
+            QMessageBox.warning(self, "Warning", "\n\n".join(errors))
+
+        if not jobs:
+            LOGGER.error("Conversion failed.")
+            if not errors:
+                QMessageBox.critical(
+                    self, "Error", "Conversion failed."
+                )
+            return
+
+        max_concurrent = ffmpeg.get_max_concurrent_jobs(output_format, codec, len(jobs))
+        for job in jobs:
+            job["workers"] = max(1, constants.NATIVE_IMAGE_WORKERS // max_concurrent)
+        self.job_queue = job_runner.JobQueue(jobs, max_concurrent, self)
+        self.job_queue.job_progress.connect(self.update_progress)
+        self.job_queue.job_finished.connect(self.update_job_count)
+        self.job_queue.queue_finished.connect(self.conversion_finished)
+        self.progress_bar.setValue(0)
+        self.progress_lb.setText("Starting...")
+        self.set_progress_visible(True)
+        self.job_queue.start()
+
+    def build_separate_jobs(
+            self, save_path, output_format, checked_items, frame_rate, codec, resize
+    ):
+        # Checked frames of an unchecked sequence ("index-row" keys) stay
+        # together with their sequence as one job.
+        groups = {}
+        for key, entry in checked_items.items():
+            top_index = int(str(key).split("-")[0])
+            if top_index not in groups:
+                groups[top_index] = {}
+            groups[top_index][key] = entry
+
+        save_dir = os.path.dirname(save_path) if save_path else ""
+        max_segments = self._get_max_segments(len(groups))
+        jobs, errors = [], []
+        used = set()
+        for items in groups.values():
+            output_path = self._get_output_path(items)
+            if not output_path:
+                continue
+            if save_dir:
+                output_path = str(Path(save_dir) / Path(output_path).name)
+            # Same named sequences from different folders meet in save_dir.
+            output_path = ffmpeg.get_unique_output_path(output_path, used)
+
+            try:
+                jobs.append(ffmpeg.build_conversion(
+                    output_path, output_format, items, frame_rate=frame_rate,
+                    codec=codec, resize=resize, max_segments=max_segments,
+                    raw_feed=self.raw_feed_chb.isChecked(),
+                    native=self.native_image_chb.isChecked(),
+                    layer=self._get_layer(items)
+                ))
+            except ffmpeg.ConversionError as e:
+                errors.append(f"{Path(output_path).name}: {e}")
+
+        return jobs, errors
+
+    def _get_max_segments(self, job_count: int) -> int:
+        if not self.segment_encode_chb.isChecked():
+            return 1
+
+        # Share the encoder slots between the queued jobs.
+        output_format = self.output_format_cb.currentText()
+        codec = self.codec_cb.currentText()
+        slots = ffmpeg.get_max_concurrent_jobs(
+            output_format, codec, constants.MAX_CONCURRENT_JOBS
         )
+        return max(1, slots // max(1, job_count))
 
-        if not converted:
-            LOGGER.error("Conversion failed.")
+    def update_progress(self, index: int, status: dict):
+        self.progress_bar.setValue(self.job_queue.total_percent())
+        text = (
+            f"Frame {status['frame']}  {status['fps']:.1f} fps  "
+            f"{status['speed']}  ETA {job_runner.format_eta(status['eta'])}"
+        )
+        if len(self.job_queue.jobs) > 1:
+            text = f"Job {index + 1}/{len(self.job_queue.jobs)}  {text}"
+        self.progress_lb.setText(text)
+
+    def update_job_count(self, index: int, success: bool, message: str):
+        self.progress_bar.setValue(self.job_queue.total_percent())
+        if len(self.job_queue.jobs) > 1:
+            done = len(self.job_queue.results)
+            self.progress_lb.setText(
+                f"{done}/{len(self.job_queue.jobs)} jobs done, "
+                f"{len(self.job_queue.running)} running"
+            )
+
+    def cancel_conversion(self):
+        if self.job_queue and self.job_queue.is_running():
+            self.job_queue.cancel()
+
+    def closeEvent(self, event):
+        if self.job_queue and self.job_queue.is_running():
+            reply = QMessageBox.information(
+                self, "Convert", "A conversion is running. Cancel it and quit?",
+                QMessageBox.Ok | QMessageBox.Cancel
+            )
+            if reply == QMessageBox.Cancel:
+                event.ignore()
+                return
+            # Kill ffmpeg and let the workers clean up before Qt tears down.
+            self.job_queue.cancel()
+            self.job_queue.wait()
+        super().closeEvent(event)
+
+    def conversion_finished(self):
+        job_queue = self.job_queue
+        self.job_queue = None
+        self.set_progress_visible(False)
+
+        failed = job_queue.failed_jobs()
+        if job_queue.cancelled:
+            QMessageBox.information(self, "Information", "Conversion cancelled.")
+        elif failed:
+            message = "\n\n".join(
+                f"{job_queue.jobs[index]['save_path']}\n{job_queue.results[index][1]}"
+                for index in failed
+            )
             QMessageBox.critical(
-                self, "Error", "Conversion failed."
+                self, "Error", 
+                f"{len(failed)} of {len(job_queue.jobs)} conversion(s) failed \n\n{message}"
+            )
+        else:
+            QMessageBox.information(
+                self, "Information", "Conversion is done"
             )
+            save_path = job_queue.jobs[0]["save_path"]
+            ffmpeg.open_directory(os.path.dirname(save_path))
 
@@ -0,0 +1,666 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from qt_compat import Qt, QAbstractItemModel, QModelIndex, QMimeData, QColor
+import converter_constants as constants
+import file_handler as handler
+from frame_sequence import format_ranges, frame_ranges
+from HANLib import init_logger
+
+# Set Logger
+log_name = "tree_model"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+CHECKBOX_COL = 0
+FILE_NAME_COL = 1
+FORMAT_COL = 2
+IMAGE_SIZE_COL = 3
+FILE_SIZE_COL = 4
+PATH_COL = 5
+
+ROW_MIME_TYPE = "application/x-imgconverter-rows"
+OUTLIER_COLOR = "#e5a50a"
+
+
+def state_value(state) -> int:
+    # PySide2 enums convert with int(), PySide6 enums expose .value.
+    try:
+        return int(state)
+    except TypeError:
+        return state.value
+
+CHECKED = state_value(Qt.Checked)
+
+def normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+class ImageNode():
+    __slots__ = ("parent", "row", "file_dic", "checked", "layer")
+
+    is_sequence = False
+
+    def __init__(self, file_dic: dict):
+        self.parent = None
+        self.row = 0
+        self.file_dic = file_dic
+        self.checked = True
+        # EXR layer picked for this item, None for the default RGBA.
+        self.layer = None
+
+    def text(self, column: int) -> str:
+        if column == FILE_NAME_COL:
+            return self.file_dic["file_name"]
+        elif column == FORMAT_COL:
+            return self.file_dic["format"]
+        elif column == IMAGE_SIZE_COL:
+            return self.file_dic["image_size"]
+        elif column == FILE_SIZE_COL:
+            return self.file_dic["file_size"]
+        elif column == PATH_COL:
+            return self.file_dic["path"]
+        return ""
+
+    def child_count(self) -> int:
+        return 0
+
+    def file_bytes(self) -> int:
+        return self.file_dic.get("file_bytes", 0)
+
+
+class SequenceNode():
+    """Top level row for a FrameSequence.
+
+    rows holds the frame indices in display order. Frame rows are only
+    turned into FrameNode objects when the view fetches them.
+    """
+    __slots__ = (
+        "parent", "row", "sequence", "rows", "children", "checked", "frame_checked",
+        "checked_count", "checked_bytes", "outliers", "layer"
+    )
+
+    is_sequence = True
+
+    def __init__(self, sequence):
+        self.parent = None
+        self.row = 0
+        self.sequence = sequence
+        self.rows = list(range(len(sequence)))
+        self.children = []
+        self.checked = True
+        self.frame_checked = bytearray(b"\x01" * len(sequence))
+        # Number of checked frames in rows, kept in step with frame_checked
+        # so the parent state never needs a scan over all frames.
+        self.checked_count = len(sequence)
+        self.checked_bytes = sequence.total_size()
+        # Frame indices whose resolution differs from the rest.
+        self.outliers = set()
+        self.layer = None
+
+    def text(self, column: int) -> str:
+        if column == FILE_NAME_COL:
+            return f"{self.sequence.name} ({len(self.rows)})"
+        elif column == FORMAT_COL:
+            return self.sequence.format
+        elif column == IMAGE_SIZE_COL:
+            return self.sequence.image_size()
+        elif column == PATH_COL:
+            return self.sequence.directory
+        return ""
+
+    def tool_tip(self) -> str:
+        tool_tip = f"Frames: {self.sequence.range_string()}"
+        gaps = self.sequence.gaps()
+        if gaps:
+            tool_tip += f"\nMissing: {format_ranges(gaps)}"
+        if self.sequence.sampled:
+            tool_tip += "\nResolution sampled, verifying all frames..."
+        if self.outliers:
+            frames = format_ranges(frame_ranges(
+                self.sequence.frames[i] for i in self.outliers
+            ))
+            tool_tip += f"\nDifferent resolution: {frames}"
+        return tool_tip
+
+    def child_count(self) -> int:
+        return len(self.rows)
+
+    def set_frame_checked(self, index: int, checked: bool):
+        if bool(self.frame_checked[index]) == checked:
+            return
+        self.frame_checked[index] = checked
+        self.checked_count += 1 if checked else -1
+        size = self.sequence.file_sizes[index]
+        self.checked_bytes += size if checked else -size
+
+    def set_all_frames_checked(self, checked: bool):
+        self.checked = checked
+        if len(self.rows) == len(self.sequence):
+            self.frame_checked = bytearray((b"\x01" if checked else b"\x00") * len(self.rows))
+        else:
+            for index in self.rows:
+                self.frame_checked[index] = checked
+        self.checked_count = len(self.rows) if checked else 0
+        self.checked_bytes = self.rows_bytes() if checked else 0
+
+    def remove_frame(self, index: int):
+        self.set_frame_checked(index, False)
+
+    def all_checked(self) -> bool:
+        return self.checked_count == len(self.rows)
+
+    def rows_bytes(self) -> int:
+        if len(self.rows) == len(self.sequence):
+            return self.sequence.total_size()
+        return sum(self.sequence.file_sizes[i] for i in self.rows)
+
+    def checked_ranges(self) -> str:
+        if self.all_checked():
+            if len(self.rows) == len(self.sequence):
+                return self.sequence.range_string()
+            indices = self.rows
+        else:
+            indices = (i for i in self.rows if self.frame_checked[i])
+        frames = self.sequence.frames
+        return format_ranges(frame_ranges(sorted(frames[i] for i in indices)))
+
+    def frame_paths(self):
+        for index in self.rows:
+            yield self.sequence.path(index)
+
+
+class FrameNode():
+    __slots__ = ("parent", "index", "row")
+
+    is_sequence = False
+
+    def __init__(self, parent: SequenceNode, index: int, row=0):
+        self.parent = parent
+        self.index = index
+        self.row = row
+
+    @property
+    def checked(self) -> bool:
+        return bool(self.parent.frame_checked[self.index])
+
+    def text(self, column: int) -> str:
+        sequence = self.parent.sequence
+        if column == FILE_NAME_COL:
+            return sequence.file_name(self.index)
+        elif column == FORMAT_COL:
+            return sequence.format
+        elif column == IMAGE_SIZE_COL:
+            return sequence.image_size(self.index)
+        elif column == FILE_SIZE_COL:
+            return handler.format_file_size(sequence.file_sizes[self.index])
+        elif column == PATH_COL:
+            return sequence.path(self.index)
+        return ""
+
+    def child_count(self) -> int:
+        return 0
+
+
+class SequenceTreeModel(QAbstractItemModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.headers = constants.TABLE_HEADER
+        self.top_nodes = []
+        # Normalized path of every image and frame in the tree -> its top
+        # level node. Rows move without changing membership, so only
+        # add and remove touch it.
+        self.path_index = {}
+        # id(FrameSequence) -> its SequenceNode, for verifier results.
+        self.sequence_nodes = {}
+        # Cached selection_summary(), dropped by every change to the
+        # check state, the rows or their order.
+        self.selection = None
+
+    # Qt model interface
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.headers)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        node = self.node_from_index(parent)
+        if node is None:
+            return len(self.top_nodes)
+        if node.is_sequence:
+            return len(node.children)
+        return 0
+
+    def hasChildren(self, parent=QModelIndex()):
+        node = self.node_from_index(parent)
+        if node is None:
+            return bool(self.top_nodes)
+        return node.is_sequence and bool(node.rows)
+
+    def canFetchMore(self, parent):
+        node = self.node_from_index(parent)
+        if node is None or not node.is_sequence:
+            return False
+        return len(node.children) < len(node.rows)
+
+    def fetchMore(self, parent):
+        node = self.node_from_index(parent)
+        if node is None or not node.is_sequence:
+            return
+
+        start = len(node.children)
+        end = min(len(node.rows), start + constants.TREE_FETCH_BATCH)
+        if end <= start:
+            return
+
+        self.beginInsertRows(parent, start, end - 1)
+        node.children.extend(FrameNode(node, node.rows[i], i) for i in range(start, end))
+        self.endInsertRows()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+
+        node = self.node_from_index(parent)
+        if node is None:
+            return self.createIndex(row, column, self.top_nodes[row])
+        return self.createIndex(row, column, node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+
+        node = index.internalPointer()
+        if node.parent is None:
+            return QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled
+        return (
+            Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+            | Qt.ItemIsDragEnabled
+        )
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        node = index.internalPointer()
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            return node.text(column)
+        elif role == Qt.CheckStateRole and column == CHECKBOX_COL:
+            return Qt.Checked if node.checked else Qt.Unchecked
+        elif role == Qt.ToolTipRole and column == FILE_NAME_COL and node.is_sequence:
+            return node.tool_tip()
+        elif role == Qt.ForegroundRole and self._is_outlier(node):
+            return QColor(OUTLIER_COLOR)
+        elif role == Qt.ToolTipRole and self._is_outlier(node):
+            return "Resolution differs from the rest of the sequence."
+        return None
+
+    def _is_outlier(self, node) -> bool:
+        if node.is_sequence:
+            return bool(node.outliers)
+        if isinstance(node, FrameNode):
+            return node.index in node.parent.outliers
+        return False
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+
+        checked = state_value(value) == CHECKED
+        self.set_checked(index.internalPointer(), checked)
+        return True
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [ROW_MIME_TYPE]
+
+    def mimeData(self, indexes):
+        mime_data = QMimeData()
+        mime_data.setData(ROW_MIME_TYPE, b"")
+        return mime_data
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        # -1 asks for the unsorted order, the checkbox column has no text.
+        if column < 0 or column == CHECKBOX_COL:
+            return
+        reverse = order == Qt.DescendingOrder
+
+        self.layoutAboutToBeChanged.emit()
+        old_indexes = self.persistentIndexList()
+        old_nodes = [(index.internalPointer(), index.column()) for index in old_indexes]
+
+        self.selection = None
+        self.top_nodes.sort(key=lambda node: node.text(column), reverse=reverse)
+        self._renumber(self.top_nodes)
+        for node in self.top_nodes:
+            if node.is_sequence:
+                self._sort_frames(node, column, reverse)
+
+        new_indexes = [self.index_from_node(node, column) for node, column in old_nodes]
+        self.changePersistentIndexList(old_indexes, new_indexes)
+        self.layoutChanged.emit()
+
+    def _sort_frames(self, node: SequenceNode, column: int, reverse: bool):
+        sequence = node.sequence
+        if column == FILE_SIZE_COL:
+            key = sequence.file_sizes.__getitem__
+        elif column == IMAGE_SIZE_COL:
+            key = lambda i: sequence.widths[i] * sequence.heights[i]
+        else:
+            key = sequence.frames.__getitem__
+        node.rows.sort(key=key, reverse=reverse)
+
+        fetched = {child.index: child for child in node.children}
+        node.children = [
+            fetched.get(i) or FrameNode(node, i) for i in node.rows[:len(node.children)]
+        ]
+        self._renumber(node.children)
+
+    # Helpers
+
+    def node_from_index(self, index):
+        if not index.isValid():
+            return None
+        return index.internalPointer()
+
+    def index_from_node(self, node, column=0):
+        if node is None:
+            return QModelIndex()
+        row = self._row_of(node)
+        if row < 0:
+            return QModelIndex()
+        return self.createIndex(row, column, node)
+
+    def contains_path(self, path: str) -> bool:
+        return normalize_path(path) in self.path_index
+
+    def node_for_path(self, path: str):
+        return self.path_index.get(normalize_path(path))
+
+    def add_sequence(self, sequence) -> SequenceNode:
+        return self.add_batch([sequence], [])[0]
+
+    def add_image(self, file_dic: dict) -> ImageNode:
+        return self.add_batch([], [file_dic])[0]
+
+    def add_batch(self, sequences: list, file_dics: list[dict]) -> list:
+        """Append sequences and images as one block of rows."""
+        nodes = []
+        for sequence in sequences:
+            node = SequenceNode(sequence)
+            self.sequence_nodes[id(sequence)] = node
+            for path in sequence.paths():
+                self.path_index[normalize_path(path)] = node
+            nodes.append(node)
+        for file_dic in file_dics:
+            node = ImageNode(file_dic)
+            self.path_index[normalize_path(file_dic["path"])] = node
+            nodes.append(node)
+
+        if not nodes:
+            return nodes
+
+        self.selection = None
+        row = len(self.top_nodes)
+        self.beginInsertRows(QModelIndex(), row, row + len(nodes) - 1)
+        self.top_nodes.extend(nodes)
+        self._renumber(self.top_nodes, row)
+        self.endInsertRows()
+        return nodes
+
+    def remove_nodes(self, nodes: list):
+        # Remove children before their parents, bottom rows first, so the
+        # remaining rows keep valid positions while removing.
+        children = [node for node in nodes if node.parent is not None]
+        tops = [node for node in nodes if node.parent is None]
+        self.selection = None
+
+        parents = []
+        for node in sorted(children, key=self._row_of, reverse=True):
+            parent = node.parent
+            row = self._row_of(node)
+            if node.parent in tops or row < 0:
+                continue
+            self.beginRemoveRows(self.index_from_node(parent), row, row)
+            del parent.children[row]
+            del parent.rows[row]
+            self._renumber(parent.children, row)
+            parent.remove_frame(node.index)
+            self.endRemoveRows()
+            self.path_index.pop(normalize_path(node.text(PATH_COL)), None)
+            if parent not in parents:
+                parents.append(parent)
+
+        for parent in parents:
+            self._update_parent_check(parent)
+            self.dataChanged.emit(
+                self.index_from_node(parent, FILE_NAME_COL),
+                self.index_from_node(parent, FILE_NAME_COL)
+            )
+
+        for node in sorted(tops, key=self._row_of, reverse=True):
+            row = self._row_of(node)
+            if row < 0:
+                continue
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.top_nodes[row]
+            self._renumber(self.top_nodes, row)
+            self.endRemoveRows()
+
+            if node.is_sequence:
+                self.sequence_nodes.pop(id(node.sequence), None)
+                for path in node.frame_paths():
+                    self.path_index.pop(normalize_path(path), None)
+            else:
+                self.path_index.pop(normalize_path(node.text(PATH_COL)), None)
+
+    def move_node(self, node, new_row: int):
+        if node.parent is None:
+            siblings = self.top_nodes
+            parent_index = QModelIndex()
+        else:
+            siblings = node.parent.children
+            parent_index = self.index_from_node(node.parent)
+
+        row = node.row
+        new_row = max(0, min(new_row, len(siblings) - 1))
+        if new_row == row:
+            return
+
+        self.selection = None
+        # beginMoveRows takes the destination before the move.
+        destination = new_row + 1 if new_row > row else new_row
+        self.beginMoveRows(parent_index, row, row, parent_index, destination)
+        del siblings[row]
+        siblings.insert(new_row, node)
+        self._renumber(siblings, min(row, new_row), max(row, new_row) + 1)
+        if node.parent is not None:
+            rows = node.parent.rows
+            del rows[row]
+            rows.insert(new_row, node.index)
+        self.endMoveRows()
+
+    def apply_verification(self, sequence, records: list[dict]):
+        """Store the per-frame probe of a fast-scanned sequence and flag outliers."""
+        node = self.sequence_nodes.get(id(sequence))
+        if node is None or node.sequence is not sequence or len(records) != len(sequence):
+            return
+
+        for i, record in enumerate(records):
+            sequence.file_sizes[i] = record["file_size"]
+            sequence.widths[i] = record["width"] or 0
+            sequence.heights[i] = record["height"] or 0
+        sequence.sampled = False
+        node.outliers = set(sequence.outliers())
+        node.checked_bytes = sum(
+            sequence.file_sizes[i] for i in node.rows if node.frame_checked[i]
+        )
+        self.selection = None
+
+        if node.outliers:
+            LOGGER.warning(
+                f"{len(node.outliers)} frame(s) with a different resolution: "
+                f"{sequence.padding_path()}"
+            )
+
+        last_col = self.columnCount() - 1
+        self.dataChanged.emit(
+            self.index_from_node(node, 0), self.index_from_node(node, last_col)
+        )
+        if node.children:
+            self.dataChanged.emit(
+                self.index_from_node(node.children[0], 0),
+                self.index_from_node(node.children[-1], last_col)
+            )
+
+    def set_checked(self, node, checked: bool):
+        self.selection = None
+        if node.is_sequence:
+            node.set_all_frames_checked(checked)
+            self._emit_check_changed(node)
+            self._emit_children_check_changed(node)
+        elif isinstance(node, FrameNode):
+            node.parent.set_frame_checked(node.index, checked)
+            self._emit_check_changed(node)
+            self._update_parent_check(node.parent)
+        else:
+            node.checked = checked
+            self._emit_check_changed(node)
+
+    def set_layer(self, node, layer):
+        if isinstance(node, FrameNode):
+            node = node.parent
+        self.selection = None
+        node.layer = layer
+
+    def set_all_checked(self, checked: bool):
+        # Update every node first, then send one range per level instead of
+        # a signal per row.
+        if not self.top_nodes:
+            return
+
+        self.selection = None
+        for node in self.top_nodes:
+            if node.is_sequence:
+                node.set_all_frames_checked(checked)
+            else:
+                node.checked = checked
+
+        self.dataChanged.emit(
+            self.index(0, CHECKBOX_COL),
+            self.index(len(self.top_nodes) - 1, CHECKBOX_COL),
+            [Qt.CheckStateRole]
+        )
+        for node in self.top_nodes:
+            if node.is_sequence:
+                self._emit_children_check_changed(node)
+
+    def selection_summary(self) -> dict:
+        """Checked items, formats, ranges and size of the current selection.
+
+        Built once after a change and reused until the next one, so repeated
+        reads on Convert and Save As cost nothing. Sequence sizes come from
+        the per-node counters, only partly checked sequences are walked.
+        """
+        if self.selection is None:
+            self.selection = self._build_selection()
+        return self.selection
+
+    def _build_selection(self) -> dict:
+
+        items = {}
+        formats = set()
+        ranges = {}
+        total_bytes = 0
+        for index, node in enumerate(self.top_nodes):
+            if not node.is_sequence:
+                if not node.checked:
+                    continue
+                items[index] = {
+                    "type": "non_seq", "path": {0: node.text(PATH_COL)},
+                    "layer": node.layer
+                }
+                formats.add(node.text(FORMAT_COL))
+                total_bytes += node.file_bytes()
+                continue
+
+            if not node.checked_count:
+                continue
+
+            sequence = node.sequence
+            formats.add(sequence.format)
+            total_bytes += node.checked_bytes
+            ranges[index] = node.checked_ranges()
+
+            if node.all_checked():
+                if len(node.rows) != len(sequence):
+                    sequence = sequence.subset(sorted(node.rows))
+                items[index] = {
+                    "type": "seq", "sequence": sequence, "layer": node.layer
+                }
+            else:
+                for j, frame_index in enumerate(node.rows):
+                    if node.frame_checked[frame_index]:
+                        items[f"{index}-{j}"] = {
+                            "type": "non_seq", "path": {0: sequence.path(frame_index)},
+                            "layer": node.layer
+                        }
+
+        return {
+            "items": items,
+            "formats": formats,
+            "ranges": ranges,
+            "bytes": total_bytes,
+        }
+
+    def _emit_children_check_changed(self, node: SequenceNode):
+        if not node.children:
+            return
+        self.dataChanged.emit(
+            self.createIndex(0, CHECKBOX_COL, node.children[0]),
+            self.createIndex(len(node.children) - 1, CHECKBOX_COL, node.children[-1]),
+            [Qt.CheckStateRole]
+        )
+
+    def _update_parent_check(self, parent: SequenceNode):
+        checked = parent.all_checked()
+        if checked != parent.checked:
+            parent.checked = checked
+            self._emit_check_changed(parent)
+
+    def _emit_check_changed(self, node):
+        index = self.index_from_node(node, CHECKBOX_COL)
+        if index.isValid():
+            self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+
+    def _row_of(self, node) -> int:
+        # -1 once the node was removed from the model.
+        siblings = self.top_nodes if node.parent is None else node.parent.children
+        row = node.row
+        if row < len(siblings) and siblings[row] is node:
+            return row
+        return -1
+
+    def _renumber(self, siblings: list, start=0, end=None):
+        # Nodes carry their row so parent() and index_from_node never search.
+        for row in range(start, len(siblings) if end is None else end):
+            siblings[row].row = row
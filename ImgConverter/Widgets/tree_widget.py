@@ -6,10 +6,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 sys.path.append(os.path.dirname(__file__))
 
 from qt_compat import (
-    QTreeWidget, QApplication, Qt, QTreeWidgetItem, QAbstractItemView, QMessageBox
+    QTreeView, QApplication, Qt, QAbstractItemView, QMessageBox,
+    QItemSelectionModel, Signal
 )
 import converter_constants as constants
 import file_handler as handler
+from Widgets import tree_model
+from Widgets.tree_model import SequenceTreeModel
+from sequence_verifier import SequenceVerifier
+from scan_worker import ScanWorker
 from HANLib import init_logger
 
 # Set Logger
@@ -18,23 +23,32 @@ log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
 log_path = str(Path(log_dir) / f"{log_name}.log")
 LOGGER = init_logger.Logger(log_name, log_path)
 
-class DragDropTreeWidget(QTreeWidget):
+class DragDropTreeWidget(QTreeView):
+    scan_started = Signal()
+    scan_progress = Signal(int, int)
+    scan_finished = Signal(bool)
+
     def __init__(self, parent=None):
         super(DragDropTreeWidget, self).__init__(parent)
         self.window_ui = None
+        self.scan_worker = None
+        self.pending_scans = []
+        self.tree_model = SequenceTreeModel(self)
+        self.setModel(self.tree_model)
+        self.verifier = SequenceVerifier(self)
+        self.verifier.verified.connect(self.tree_model.apply_verification)
         self.constants_column()
         self.set_tree_widget()
         self.setup_drag_drop()
         self.toggle_all_checkboxes(True)
-        self.itemChanged.connect(self.sync_children_with_parent)
 
     def constants_column(self):
-        self.checkbox_col = 0
-        self.file_name_col = 1
-        self.format_col = 2
-        self.image_size_col = 3
-        self.file_size_col = 4
-        self.path_col = 5
+        self.checkbox_col = tree_model.CHECKBOX_COL
+        self.file_name_col = tree_model.FILE_NAME_COL
+        self.format_col = tree_model.FORMAT_COL
+        self.image_size_col = tree_model.IMAGE_SIZE_COL
+        self.file_size_col = tree_model.FILE_SIZE_COL
+        self.path_col = tree_model.PATH_COL
 
     def setup_drag_drop(self):
         self.setAcceptDrops(True)
@@ -42,7 +56,7 @@ class DragDropTreeWidget(QTreeWidget):
         self.setDropIndicatorShown(True)
         self.setDragDropMode(QAbstractItemView.DragDrop)
         self.setDefaultDropAction(Qt.MoveAction)
-    
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls(): # outside
             event.acceptProposedAction()
@@ -50,7 +64,7 @@ class DragDropTreeWidget(QTreeWidget):
             event.acceptProposedAction()
         else:
             event.ignore()
-    
+
     def dragMoveEvent(self, event):
         if event.mimeData().hasUrls(): # outside
             event.acceptProposedAction()
@@ -58,7 +72,7 @@ class DragDropTreeWidget(QTreeWidget):
             event.acceptProposedAction()
         else:
             event.ignore()
-    
+
     def dropEvent(self, event):
         if event.mimeData().hasUrls(): # outside
             paths = []
@@ -69,22 +83,49 @@ class DragDropTreeWidget(QTreeWidget):
 
             if not paths:
                 return
-            
+
             self.populate_tree(paths, self.window_ui)
             event.acceptProposedAction()
 
         elif event.source() == self: # inside
-            super().dropEvent(event)
+            self.drop_selected(event)
         else:
             event.ignore()
 
+    def drop_selected(self, event):
+        pos = event.position().toPoint() if hasattr(event, "position") else event.pos()
+        target = self.indexAt(pos)
+        nodes = self.selected_nodes()
+        if not nodes or not target.isValid():
+            event.ignore()
+            return
+
+        target_node = self.tree_model.node_from_index(target)
+        parent = nodes[0].parent
+        if target_node.parent is not parent or any(node.parent is not parent for node in nodes):
+            event.ignore()
+            return
+
+        siblings = parent.children if parent else self.tree_model.top_nodes
+        row = target.row()
+        if pos.y() > self.visualRect(target).center().y():
+            row += 1
+
+        # Keep the dropped block together in its current order.
+        nodes.sort(key=siblings.index)
+        for node in nodes:
+            current = siblings.index(node)
+            new_row = row if row < current else row - 1
+            self.tree_model.move_node(node, new_row)
+            row = siblings.index(node) + 1
+
+        self.select_nodes(nodes)
+        event.setDropAction(Qt.CopyAction)
+        event.accept()
+
     def set_tree_widget(self):
         self.setMinimumWidth(800)
 
-        headers = constants.TABLE_HEADER
-        self.setColumnCount(len(headers))
-        self.setHeaderLabels(headers)
-
         self.setColumnWidth(self.checkbox_col, 65)
         self.setColumnWidth(self.file_name_col, 200)
         self.setColumnWidth(self.format_col, 80)
@@ -92,104 +133,142 @@ class DragDropTreeWidget(QTreeWidget):
         self.setColumnWidth(self.file_size_col, 100)
         self.setColumnWidth(self.path_col, 300)
 
-        self.setEditTriggers(QTreeWidget.NoEditTriggers)
-        self.setSelectionBehavior(QTreeWidget.SelectRows)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setUniformRowHeights(True)
+        self.enable_sorting()
+
+    def enable_sorting(self):
+        # setSortingEnabled re-sorts by the header indicator, clear it so
+        # only a header click orders the rows.
+        self.header().setSortIndicator(-1, Qt.AscendingOrder)
         self.setSortingEnabled(True)
 
     def populate_tree(self, paths: list[str], window_ui=None):
+        if window_ui:
+            self.window_ui = window_ui
+
+        # One scan at a time, later drops wait for the running one.
+        if self.scan_worker is not None:
+            self.pending_scans.append(list(paths))
+            return
+
+        self.setSortingEnabled(False)
+        self.scan_worker = ScanWorker(list(paths), self)
+        self.scan_worker.batch_ready.connect(self.add_paths_info)
+        self.scan_worker.progress.connect(self.scan_progress)
+        self.scan_worker.scan_finished.connect(self.on_scan_finished)
+        self.scan_started.emit()
+        self.scan_worker.start()
+
+    def on_scan_finished(self, cancelled: bool):
+        self.scan_worker.wait()
+        self.scan_worker.deleteLater()
+        self.scan_worker = None
+
+        if self.pending_scans and not cancelled:
+            self.populate_tree(self.pending_scans.pop(0))
+            return
+
+        self.pending_scans.clear()
+        self.enable_sorting()
+        self.scan_finished.emit(cancelled)
+
+    def cancel_scan(self):
+        self.pending_scans.clear()
+        if self.scan_worker is not None:
+            self.scan_worker.cancel()
+
+    def stop_workers(self):
+        self.cancel_scan()
+        self.verifier.cancel()
+        if self.scan_worker is not None:
+            self.scan_worker.wait()
+        self.verifier.wait()
 
-        seq_info, non_seq_info = handler.get_paths_info(paths)
+    def add_paths_info(self, seq_info: dict, non_seq_info: dict, window_ui=None):
 
         if not seq_info and not non_seq_info:
             return
 
+        window_ui = window_ui or self.window_ui
+        sequences, images = [], []
+        seen = set()
+
         if seq_info:
-            for dir_name, file_info in seq_info['sequence'].items():
-                tree_item = QTreeWidgetItem(self)
-                tree_item.setFlags(tree_item.flags() | Qt.ItemIsUserCheckable)
-                tree_item.setCheckState(self.checkbox_col, Qt.Checked)
-                tree_item.setText(self.format_col, file_info[0].get("format", ""))
-                tree_item.setText(self.image_size_col, file_info[0].get("image_size", ""))
-                seq_path = str(Path(file_info[0].get("path", "")).parent)
-                tree_item.setText(self.path_col, seq_path)
-                frame_count = len(file_info)
-                dir_info = f"{dir_name} ({frame_count})"
-                tree_item.setText(self.file_name_col, dir_info)
-
-                child_items = [QTreeWidgetItem(tree_item) for _ in range(len(file_info))]
-                for i, info in enumerate(file_info):
-
-                    result = self.validate_path([info["path"]])
-                    if result is False:
-                        index = self.indexOfTopLevelItem(tree_item)
-                        self.takeTopLevelItem(index)
-                        return
-
-                    child_items[i].setFlags(child_items[i].flags() | Qt.ItemIsUserCheckable)
-                    child_items[i].setCheckState(self.checkbox_col, Qt.Checked)
-                    child_items[i].setText(self.file_name_col, info["file_name"])
-                    child_items[i].setText(self.format_col, info["format"])
-                    child_items[i].setText(self.image_size_col, info["image_size"])
-                    child_items[i].setText(self.file_size_col, info["file_size"])
-                    child_items[i].setText(self.path_col, info["path"])
-
-                tree_item.addChildren(child_items)
-                self.addTopLevelItem(tree_item)
-                self.add_new_resize_option(file_info, dir_name, window_ui)
+            for sequence in seq_info['sequence'].values():
+                # Whole plates are deduplicated before any row is created.
+                result = self.validate_path(sequence.paths())
+                if result is False or sequence.padding_path() in seen:
+                    LOGGER.warning(f"Already in the list: {sequence.padding_path()}")
+                    continue
+                seen.add(sequence.padding_path())
+                sequences.append(sequence)
 
         if non_seq_info:
             for none_seq in non_seq_info['none_sequence']:
                 result = self.validate_path([none_seq["path"]])
-                if result is False:
-                    return
-                tree_item = QTreeWidgetItem(self)
-                tree_item.setFlags(tree_item.flags() | Qt.ItemIsUserCheckable)
-                tree_item.setCheckState(self.checkbox_col, Qt.Checked)
-                tree_item.setText(self.file_name_col, none_seq["file_name"])
-                tree_item.setText(self.format_col, none_seq["format"])
-                tree_item.setText(self.image_size_col, none_seq["image_size"])
-                tree_item.setText(self.file_size_col, none_seq["file_size"])
-                tree_item.setText(self.path_col, none_seq["path"])
-                self.addTopLevelItem(tree_item)
-
-    def add_new_resize_option(self, file_info: dict, dir_name: str, window_ui=None):
+                if result is False or none_seq["path"] in seen:
+                    LOGGER.warning(f"Already in the list: {none_seq['path']}")
+                    continue
+                seen.add(none_seq["path"])
+                images.append(none_seq)
+
+        self.tree_model.add_batch(sequences, images)
+
+        for sequence in sequences:
+            self.add_new_resize_option(sequence, sequence.name, window_ui)
+            if sequence.sampled:
+                self.verifier.add(sequence)
+
+    def add_new_resize_option(self, sequence, dir_name: str, window_ui=None):
         if not window_ui:
             return
 
         self.window_ui = window_ui
-        img_size = file_info[0].get("image_size", "").replace(" ", "")
+        img_size = sequence.image_size().replace(" ", "")
         new_size = f"{dir_name}({img_size})"
         cannot_find = -1
         if self.window_ui.resize_cb.findText(new_size) == cannot_find:
             self.window_ui.resize_cb.insertSeparator(len(constants.RESIZE))
             self.window_ui.resize_cb.addItem(new_size)
 
-    def remove_selected_rows(self):
-        selected_items = self.selectedItems()
+    def selected_nodes(self) -> list:
+        nodes = []
+        for index in self.selectionModel().selectedRows(self.checkbox_col):
+            node = self.tree_model.node_from_index(index)
+            if node is not None:
+                nodes.append(node)
+        return nodes
+
+    def select_nodes(self, nodes: list):
+        selection_model = self.selectionModel()
+        selection_model.clearSelection()
+        for node in nodes:
+            index = self.tree_model.index_from_node(node)
+            if index.isValid():
+                selection_model.select(
+                    index, QItemSelectionModel.Select | QItemSelectionModel.Rows
+                )
 
-        for item in selected_items:
-            parent = item.parent()
-            if parent:
-                index = parent.indexOfChild(item)
-                parent.takeChild(index)
-            else:
-                index = self.indexOfTopLevelItem(item)
-                self.takeTopLevelItem(index)
+    def remove_selected_rows(self):
+        self.tree_model.remove_nodes(self.selected_nodes())
 
     def move_selected(self, direction):
         self.setSortingEnabled(False)
-        items = self.selectedItems()
+        items = self.selected_nodes()
         if not items:
             return
-        
-        parent = items[0].parent()
+
+        parent = items[0].parent
         if parent:
-            all_children = [parent.child(i) for i in range(parent.childCount())]
+            all_children = list(parent.children)
         else:
-            all_children = [self.topLevelItem(i) for i in range(self.topLevelItemCount())]
+            all_children = list(self.tree_model.top_nodes)
 
-        indices = [all_children.index(i) for i in items]
+        items = [item for item in items if item.parent is parent]
+        indices = [item.row for item in items]
 
         if direction < 0: # up
             indices.sort()
@@ -198,158 +277,48 @@ class DragDropTreeWidget(QTreeWidget):
 
         for idx in indices:
             item = all_children[idx]
-            if parent:
-                parent.takeChild(idx)
-                new_index = idx + direction
-                new_index = max(0, min(new_index, parent.childCount()))
-                parent.insertChild(new_index, item)                
-            else:
-                self.takeTopLevelItem(idx)
-                new_index = idx + direction
-                new_index = max(0, min(new_index, self.topLevelItemCount()))
-                self.insertTopLevelItem(new_index, item)                
-
-        for item in items:
-            item.setSelected(True)
-
-    def validate_path(self, paths: list[str]):
+            self.tree_model.move_node(item, idx + direction)
+
+        self.select_nodes(items)
+
+    def validate_path(self, paths):
 
         if not paths:
             return True
-        
-        if self.topLevelItemCount() == 0:
-            return True
 
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i) # parents
-            if item.childCount() > 0: # children 
-                for j in range(item.childCount()):
-                    child = item.child(j)
-                    tree_path = child.text(self.path_col)
-                    if tree_path in paths:
-                        return False
-
-            tree_path = item.text(self.path_col)
-            if tree_path in paths:
+        for path in paths:
+            if self.tree_model.contains_path(path):
                 return False
 
         return True
 
     def get_checked_items(self) -> dict:
-        checked_paths = {}
-        for i in range(self.topLevelItemCount()):
-            parent = self.topLevelItem(i)
-            index = self.indexOfTopLevelItem(parent)
-
-            if parent.childCount() == 0: 
-                if parent.checkState(self.checkbox_col) != Qt.Checked:
-                    continue
-                checked_paths[index] = {"type": "non_seq", "path": {0: parent.text(self.path_col)}}
-
-            elif parent.childCount() > 0:
-                for j in range(parent.childCount()):
-                    child = parent.child(j)
-                    if parent.checkState(self.checkbox_col) != Qt.Checked:
-                        if child.checkState(self.checkbox_col) != Qt.Checked:
-                            continue
-                        child_path = child.text(self.path_col)
-                        checked_paths[f"{index}-{j}"] = {"type": "non_seq", "path": {0: child_path}}
-                    elif parent.checkState(self.checkbox_col) == Qt.Checked:
-                        if index not in checked_paths:
-                            checked_paths[index] = {"type": "seq", "path": {}}
-
-                        child_index = parent.indexOfChild(child)
-                        seq_child_index = f"{index}-{child_index}"
-                        checked_paths[index]["path"][seq_child_index] = child.text(self.path_col)
-            
-
-        LOGGER.info(f"Count of Checked Items: {len(checked_paths)}")
+        # Cached by the model until the selection changes, callers only read it.
+        summary = self.tree_model.selection_summary()
+        checked_paths = summary["items"]
+
+        LOGGER.info(
+            f"Count of Checked Items: {len(checked_paths)}, "
+            f"{handler.format_file_size(summary['bytes'])}"
+        )
         return checked_paths
 
     def toggle_all_checkboxes(self, checked: bool):
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i)
-            if not item.flags() & Qt.ItemIsUserCheckable:
-                continue
-            item.setCheckState(self.checkbox_col, Qt.Checked if checked else Qt.Unchecked)
-            for j in range(item.childCount()):
-                child = item.child(j)
-                if not child.flags() & Qt.ItemIsUserCheckable:
-                    continue
-                child.setCheckState(
-                    self.checkbox_col,
-                    Qt.Checked if checked else Qt.Unchecked
-                )
-
-    def sync_children_with_parent(self, item: QTreeWidgetItem):
-
-        if item.parent(): # child
-            parent = item.parent()
-            child = item
-            if not child.flags() & Qt.ItemIsUserCheckable:
-                return
-            if child.checkState(self.checkbox_col) != Qt.Checked:
-                self.blockSignals(True)
-                parent.setCheckState(self.checkbox_col, Qt.Unchecked)
-                self.blockSignals(False)
-                return
-            
-            else:
-                for j in range(parent.childCount()):
-                    sibling = parent.child(j)
-                    if not sibling.flags() & Qt.ItemIsUserCheckable:
-                        continue
-                    if sibling != child:
-                        if sibling.checkState(self.checkbox_col) == Qt.Checked:
-                            checked_count = sum(
-                                1 for k in range(parent.childCount())
-                                if parent.child(k).checkState(self.checkbox_col) == Qt.Checked
-                            )
-                            if checked_count == parent.childCount():
-                                parent.setCheckState(self.checkbox_col, Qt.Checked)
-                            return
-                            
-        elif item.parent() is None: # parent
-            parent = item
-            if not parent.flags() & Qt.ItemIsUserCheckable:
-                return
-            for j in range(parent.childCount()):
-                child = parent.child(j)
-                if not child.flags() & Qt.ItemIsUserCheckable:
-                    continue
-                child.setCheckState(
-                    self.checkbox_col, 
-                    parent.checkState(self.checkbox_col)
-                    )
+        self.tree_model.set_all_checked(checked)
 
     def validate_format(self):
 
-        if self.topLevelItemCount() == 0:
+        if not self.tree_model.top_nodes:
             return False
 
-        formats = set()
-        for i in range(self.topLevelItemCount()):
-            item = self.topLevelItem(i) 
-            if item.checkState(self.checkbox_col) != Qt.Checked:
-                continue
-            if item.childCount() > 0: 
-                for j in range(item.childCount()):
-                    child = item.child(j)
-                    if child.checkState(self.checkbox_col) != Qt.Checked:
-                        continue
-                    format = child.text(self.format_col)
-                    formats.add(format)
-            elif item.childCount() == 0:
-                formats.add(item.text(self.format_col))
-
-        formats = tuple(formats)
+        formats = tuple(self.tree_model.selection_summary()["formats"])
 
         if len(formats) > 1:
             LOGGER.warning(
                 f"Multiple file formats selected: {formats}."
             )
             QMessageBox.warning(
-                self, "Warning", 
+                self, "Warning",
                 f"Multiple file formats selected:\n "
                 f"{formats}\n "
                 f"Please select files with the same format."
@@ -362,4 +331,4 @@ if __name__ == "__main__":
     window = DragDropTreeWidget()
     window.show()
     window.populate_tree([r'C:\Users\PHB\Pictures'])
-    sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
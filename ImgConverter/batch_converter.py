@@ -0,0 +1,318 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(os.path.dirname(__file__))
+
+import converter_constants as constants
+import file_handler as handler
+import ffmpeg_handler as ffmpeg
+from job_executor import JobExecutor
+from HANLib import init_logger
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Set Logger
+log_name = "batch_converter"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# Keys of a job spec. None values are filled from the inputs, the same way
+# the window picks them.
+JOB_DEFAULTS = {
+    "inputs": [],
+    "format": "mov",
+    "codec": None,
+    "frame_rate": "23.976",
+    "resize": None,
+    "output": None,
+    "separate": False,
+    "segments": 1,
+    "raw_feed": False,
+    "native": False,
+    "layer": None,
+}
+
+
+class SpecError(ValueError):
+    pass
+
+
+def load_spec(path: str) -> list[dict]:
+    """Read a JSON or YAML job spec and return the job dicts.
+
+    The file holds one job, a list of jobs or {"defaults": {...}, "jobs": [...]}.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    if Path(path).suffix.lower() in (".yaml", ".yml"):
+        if yaml is None:
+            raise SpecError("PyYAML is not installed, use a JSON job spec.")
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as e:
+            raise SpecError(f"Invalid YAML job spec: {e}")
+    else:
+        data = json.loads(text)
+
+    defaults = {}
+    if isinstance(data, dict) and "jobs" in data:
+        defaults = data.get("defaults") or {}
+        data = data["jobs"]
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise SpecError(f"Unsupported job spec: {path}")
+
+    # Relative inputs and outputs are relative to the spec file.
+    base_dir = os.path.dirname(os.path.abspath(path))
+    specs = []
+    for entry in data:
+        spec = {**defaults, **entry}
+        spec["inputs"] = [os.path.join(base_dir, p) for p in _as_list(spec.get("inputs"))]
+        if spec.get("output"):
+            spec["output"] = os.path.join(base_dir, spec["output"])
+        specs.append(spec)
+    return specs
+
+def normalize_spec(spec: dict) -> dict:
+
+    unknown = set(spec) - set(JOB_DEFAULTS)
+    if unknown:
+        raise SpecError(f"Unknown job spec keys: {sorted(unknown)}")
+
+    spec = {**JOB_DEFAULTS, **{k: v for k, v in spec.items() if v is not None}}
+    spec["inputs"] = _as_list(spec["inputs"])
+    spec["format"] = str(spec["format"]).lower().lstrip(".")
+    spec["frame_rate"] = str(spec["frame_rate"])
+
+    if not spec["inputs"]:
+        raise SpecError("No inputs given.")
+    if spec["format"] not in constants.OUTPUT_FORMAT:
+        raise SpecError(f"Unsupported output format: {spec['format']}")
+    if spec["format"] in constants.OUTPUT_VIDEO_FORMAT:
+        spec["codec"] = spec["codec"] or constants.EXT_WITH_CODEC.get(spec["format"], "")
+        if spec["codec"] not in constants.CODEC:
+            raise SpecError(f"Unsupported codec: {spec['codec']}")
+    if spec["resize"] is not None:
+        try:
+            ffmpeg.get_resize_size(spec["resize"])
+        except (IndexError, ValueError):
+            raise SpecError(f"Invalid resize, expected WIDTHxHEIGHT: {spec['resize']}")
+    if isinstance(spec["layer"], str):
+        spec["layer"] = (0, spec["layer"])
+    elif spec["layer"] is not None:
+        spec["layer"] = tuple(spec["layer"])
+    return spec
+
+def scan_inputs(paths: list[str]) -> tuple[dict, dict]:
+    """Scan paths like a drop on the window.
+
+    Returns checked items in the tree's get_checked_items layout, every
+    item checked, and the "WIDTHxHEIGHT" of every item by key, None when
+    it could not be read.
+    """
+    checked_items = {}
+    sizes = {}
+    for seq_info, none_seq_info in handler.iter_paths_info(paths):
+        for sequence in (seq_info or {}).get("sequence", {}).values():
+            key = len(checked_items)
+            if sequence.widths[0] and sequence.heights[0]:
+                sizes[key] = f"{sequence.widths[0]}x{sequence.heights[0]}"
+            checked_items[key] = {"type": "seq", "sequence": sequence}
+
+        for file_dic in (none_seq_info or {}).get("none_sequence", []):
+            key = len(checked_items)
+            if file_dic["image_size"] != "N/A":
+                sizes[key] = file_dic["image_size"].replace(" ", "")
+            checked_items[key] = {
+                "type": "non_seq", "path": {0: file_dic["path"]}
+            }
+
+    return checked_items, sizes
+
+def build_jobs(spec: dict) -> list[dict]:
+    """Return one result record per conversion, job holds the build_conversion dict."""
+    spec = normalize_spec(spec)
+    checked_items, sizes = scan_inputs(spec["inputs"])
+    if not checked_items:
+        return [_make_record(spec, None, "", "No images found in inputs.")]
+
+    groups = (
+        [{key: entry} for key, entry in checked_items.items()]
+        if spec["separate"] else [checked_items]
+    )
+
+    records = []
+    used = set()
+    for items in groups:
+        sequences, non_seq_paths = handler.parse_path_by_type(items)
+        # Like the window, the default size is that of the first input,
+        # taken per group so separate jobs keep their own resolution.
+        first_size = next((sizes[key] for key in items if key in sizes), None)
+        resize = spec["resize"] or f"Default({first_size or constants.RESIZE[0]})"
+        output_path = ffmpeg.get_unique_output_path(
+            get_output_path(spec, sequences, non_seq_paths, len(groups) > 1), used
+        )
+        # build_conversion writes its file lists next to the output.
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        job, error = None, ""
+        try:
+            job = ffmpeg.build_conversion(
+                output_path, spec["format"], items, frame_rate=spec["frame_rate"],
+                codec=spec["codec"], resize=resize, max_segments=spec["segments"],
+                raw_feed=spec["raw_feed"], native=spec["native"], layer=spec["layer"]
+            )
+        except ffmpeg.ConversionError as e:
+            error = str(e)
+        record = _make_record(spec, job, output_path, error)
+        record["inputs"] = (
+            [sequence.padding_path() for sequence in sequences] + non_seq_paths
+        )
+        records.append(record)
+    return records
+
+def run_jobs(records: list[dict], max_concurrent=None, on_progress=None) -> list[dict]:
+
+    runnable = [record for record in records if record["job"]]
+    if not runnable:
+        return records
+
+    if not max_concurrent:
+        output_format = runnable[0]["format"]
+        codec = runnable[0]["codec"]
+        max_concurrent = ffmpeg.get_max_concurrent_jobs(output_format, codec, len(runnable))
+    workers = max(1, constants.NATIVE_IMAGE_WORKERS // max_concurrent)
+    LOGGER.info(f"Running {len(runnable)} job(s), {max_concurrent} at a time.")
+
+    def run(record):
+        record["job"]["workers"] = workers
+        callback = None
+        if on_progress:
+            callback = lambda status: on_progress(record, status)
+        start_time = time.monotonic()
+        success, message = JobExecutor(record["job"], callback).run()
+        record["success"] = success
+        record["error"] = message
+        record["seconds"] = round(time.monotonic() - start_time, 3)
+
+    with ThreadPoolExecutor(max_workers=max_concurrent) as pool:
+        list(pool.map(run, runnable))
+    return records
+
+def to_result(record: dict) -> dict:
+
+    result = {k: v for k, v in record.items() if k != "job"}
+    job = record["job"]
+    if job:
+        result["cmd"] = job["cmd"]
+        result["segment_cmds"] = job["segment_cmds"]
+        result["total_frames"] = job["total_frames"]
+    return result
+
+def get_output_path(spec: dict, sequences, non_seq_paths, several: bool) -> str:
+
+    output_path = ffmpeg.get_default_output_path(spec["format"], sequences, non_seq_paths)
+    output = spec["output"]
+    if not output:
+        return output_path
+    # Several outputs or a folder: keep the default names inside it.
+    if several or os.path.isdir(output) or not Path(output).suffix:
+        return str(Path(output) / Path(output_path).name)
+    return output
+
+def _make_record(spec: dict, job, output_path: str, error: str) -> dict:
+
+    return {
+        "inputs": spec["inputs"],
+        "output": output_path,
+        "format": spec["format"],
+        "codec": spec["codec"],
+        "job": job,
+        "success": False,
+        "error": error,
+        "seconds": 0.0,
+    }
+
+def _as_list(value) -> list:
+
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+def _print_progress(record: dict, status: dict):
+
+    line = {"output": record["output"], **status}
+    print(json.dumps(line), file=sys.stderr, flush=True)
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="run_converter.py --batch",
+        description="Convert images and sequences without a display. "
+                    "Prints a JSON result per conversion to stdout."
+    )
+    parser.add_argument("inputs", nargs="*", help="Image files or directories.")
+    parser.add_argument("--spec", help="JSON or YAML job spec, replaces the options below.")
+    parser.add_argument("--format", choices=constants.OUTPUT_FORMAT, default="mov")
+    parser.add_argument("--codec", help="Codec name as listed in the window.")
+    parser.add_argument("--frame-rate", default="23.976")
+    parser.add_argument("--resize", help="WIDTHxHEIGHT, defaults to the first input's size.")
+    parser.add_argument("--output", help="Output file, or a directory for the default names.")
+    parser.add_argument("--separate", action="store_true", help="One output per sequence or image.")
+    parser.add_argument("--segments", type=int, default=1, help="Parallel encode segments per job.")
+    parser.add_argument("--raw-feed", action="store_true")
+    parser.add_argument("--native", action="store_true")
+    parser.add_argument("--layer", help="EXR channel prefix, e.g. diffuse.")
+    parser.add_argument("--jobs", type=int, default=None, help="Conversions run at once.")
+    parser.add_argument("--dry-run", action="store_true", help="Only build the commands.")
+    parser.add_argument("--progress", action="store_true", help="JSON progress lines on stderr.")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+
+    args = parse_args(argv)
+    try:
+        if args.spec:
+            specs = load_spec(args.spec)
+        else:
+            specs = [{
+                "inputs": args.inputs, "format": args.format, "codec": args.codec,
+                "frame_rate": args.frame_rate, "resize": args.resize,
+                "output": args.output, "separate": args.separate,
+                "segments": args.segments, "raw_feed": args.raw_feed,
+                "native": args.native, "layer": args.layer,
+            }]
+        records = [record for spec in specs for record in build_jobs(spec)]
+    except (OSError, ValueError) as e:
+        LOGGER.error(f"Invalid batch job: {e}")
+        print(json.dumps({"success": False, "error": str(e), "results": []}))
+        return 2
+
+    if args.dry_run:
+        for record in records:
+            record["success"] = bool(record["job"])
+            if record["job"]:
+                ffmpeg.cleanup_job(record["job"])
+    else:
+        run_jobs(records, args.jobs, _print_progress if args.progress else None)
+
+    results = [to_result(record) for record in records]
+    success = all(result["success"] for result in results)
+    print(json.dumps({"success": success, "results": results}, indent=2))
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -33,6 +33,35 @@ file_dir = Path(__file__).parent
 RESOURCE_PATH = str(file_dir / "Resources")
 
 TABLE_HEADER = ["", "File Name", "Format", "Image Size", "File Size", "Path"]
+# Frame rows created per fetch when a sequence is expanded in the tree.
+TREE_FETCH_BATCH = 500
+
+# Background folder scans hand rows to the tree once this many items are
+# pending or this many seconds passed, whichever comes first.
+SCAN_BATCH_ITEMS = 200
+SCAN_BATCH_INTERVAL = 0.25
+
+# Number of threads used to read image headers while scanning.
+PROBE_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# Below this many files the thread pool costs more than it saves.
+PROBE_PARALLEL_MIN_FILES = 8
+# Frames probed between two cancel checks of a background verification.
+PROBE_CHUNK_FILES = 256
+
+# Probed width/height/size/format is cached on disk and reused while a
+# file's size and mtime are unchanged.
+METADATA_CACHE_ENABLED = True
+METADATA_CACHE_MAX_ENTRIES = 500000
+
+# Read image dimensions straight from the file header and only open an
+# OpenImageIO reader for formats or variants the parser doesn't handle.
+FAST_HEADER_PROBE = True
+
+# Long sequences only probe the first, last and FAST_SCAN_SAMPLES frames in
+# between for their resolution, the rest is verified in the background.
+FAST_SCAN_ENABLED = True
+FAST_SCAN_MIN_FRAMES = 64
+FAST_SCAN_SAMPLES = 8
 
 INPUT_IMAGE_FORMAT = [
     ".jpg", ".jpeg", ".png", ".bmp", ".gif", ".exr", "tiff", ".tif", ".webp"
@@ -108,6 +137,72 @@ CODEC_WITH_EXT = {
     "DNxHD 422 8-bit 36Mbit": "mov"
 }
 
+# Roughly how many cores one ffmpeg encode keeps busy. The job queue runs
+# cpu_count // threads encodes at once, capped by MAX_CONCURRENT_JOBS.
+CODEC_THREADS = {
+    "H.264": 8,
+    "MPEG-4": 2,
+    "ProRes 4:4:4:4 XQ 12-bit": 4,
+    "ProRes 4:4:4:4 12-bit": 4,
+    "ProRes 4:2:2 HQ 10-bit": 4,
+    "ProRes 4:2:2 10-bit": 4,
+    "ProRes 4:2:2 LT 10-bit": 4,
+    "ProRes 4:2:2 Proxy 10-bit": 4,
+    "DNxHD 422 8-bit 36Mbit": 4
+}
+IMAGE_OUTPUT_THREADS = 2
+MAX_CONCURRENT_JOBS = 8
+
+# Segment encoding splits one sequence into parallel encodes joined with
+# stream copy. Each segment gets at least this many frames.
+SEGMENT_MIN_FRAMES = 240
+
+# Input formats that can be decoded with OpenImageIO and piped into ffmpeg
+# as rawvideo instead of using ffmpeg's own decoder. The buffer bounds how
+# many decoded frames wait for the encoder.
+RAW_FEED_FORMATS = ("exr",)
+RAW_FEED_WORKERS = os.cpu_count() or 1
+RAW_FEED_BUFFER_FRAMES = 16
+
+# Threads shared by the OpenImageIO image-to-image engine. Queued jobs
+# split them between each other.
+NATIVE_IMAGE_WORKERS = os.cpu_count() or 1
+
+# Preview thumbnails are decoded in the background and cached in memory
+# and on disk under the log directory.
+THUMBNAIL_WORKERS = 2
+THUMBNAIL_MEMORY_ENTRIES = 256
+THUMBNAIL_DISK_ENTRIES = 20000
+
+# Flipbook playback decodes this many frames ahead of the shown one.
+FLIPBOOK_BUFFER_FRAMES = 48
+FLIPBOOK_WORKERS = max(1, min(8, (os.cpu_count() or 1) // 2))
+
+# Watch mode converts a sequence once its frame count, sizes and mtimes
+# held still this many seconds. Without watchdog, folder mtimes are
+# checked every WATCH_POLL_INTERVAL seconds.
+WATCH_SETTLE_SECONDS = 10.0
+WATCH_POLL_INTERVAL = 2.0
+# Sequences shorter than this are left alone, e.g. a single preview frame.
+WATCH_MIN_FRAMES = 2
+
+# Farm mode keeps its queue in this SQLite file on a share every worker
+# can reach. A worker holds a job for FARM_LEASE_SECONDS and renews the
+# lease every FARM_HEARTBEAT_SECONDS, a job whose lease ran out or that
+# failed goes back to the queue until it was tried FARM_MAX_ATTEMPTS times.
+FARM_QUEUE_PATH = os.environ.get("IMGCONVERTER_FARM_DB", "")
+FARM_LEASE_SECONDS = 120
+FARM_HEARTBEAT_SECONDS = 20
+FARM_MAX_ATTEMPTS = 3
+FARM_RETRY_DELAY = 30
+FARM_POLL_INTERVAL = 5.0
+# Tries of a result write while the queue database is unreachable, the
+# wait doubles from one second between them.
+FARM_WRITE_RETRIES = 5
+# Video outputs of longer sequences are split into chunks of this many
+# frames, encoded by different workers and joined with stream copy.
+FARM_CHUNK_FRAMES = 1000
+
 EXT_WITH_CODEC = {
     "mp4": "H.264",
     "mov": "ProRes 4:4:4:4 XQ 12-bit",
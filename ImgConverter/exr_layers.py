@@ -0,0 +1,89 @@
+import os
+from pathlib import Path
+
+import OpenImageIO as oiio
+
+from HANLib import init_logger
+
+# Set Logger
+log_name = "exr_layers"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+COLOR_CHANNELS = ("R", "G", "B", "A")
+
+# A layer is (subimage, channel prefix). None means the RGBA channels of the
+# first subimage, which is what every reader used before layers existed.
+DEFAULT_LAYER = (0, "")
+
+
+def list_layers(path: str) -> list[tuple[tuple[int, str], str]]:
+    """Return [(layer, label)] for every part and channel group in path.
+
+    Only the headers are read, no pixel data.
+    """
+    img = oiio.ImageInput.open(str(path))
+    if not img:
+        LOGGER.warning(f"Failed to open image: {path} {oiio.geterror()}")
+        return []
+
+    layers = []
+    subimage = 0
+    while img.seek_subimage(subimage, 0):
+        spec = img.spec()
+        part_name = spec.getattribute("name") or ""
+        for prefix in _channel_prefixes(spec.channelnames):
+            layers.append(((subimage, prefix), layer_label(part_name, prefix)))
+        subimage += 1
+    img.close()
+
+    return layers
+
+def layer_label(part_name: str, prefix: str) -> str:
+
+    name = prefix or "RGBA"
+    if part_name and part_name != prefix:
+        name = f"{part_name} / {name}"
+    return name
+
+def resolve_channels(channel_names, prefix: str) -> list[int]:
+    """Return the indices of the R, G, B(, A) channels of prefix.
+
+    Layers without color channels (e.g. P.x, P.y, P.z) use their first
+    three channels.
+    """
+    lead = f"{prefix}." if prefix else ""
+    members = [
+        i for i, name in enumerate(channel_names)
+        if name.startswith(lead) and "." not in name[len(lead):]
+    ]
+    if not members:
+        return list(range(min(3, len(channel_names))))
+
+    by_name = {channel_names[i][len(lead):]: i for i in members}
+    color = [by_name[c] for c in COLOR_CHANNELS if c in by_name]
+    if len(color) >= 3:
+        return color
+    return members[:3]
+
+def get_layer_args(layer) -> str:
+    """Input options that make ffmpeg's EXR decoder read only this layer."""
+
+    if not layer or layer == DEFAULT_LAYER:
+        return ""
+
+    subimage, prefix = layer
+    args = f"-part {subimage}" if subimage else ""
+    if prefix:
+        args = f"{args} -layer {prefix}".strip()
+    return args
+
+def _channel_prefixes(channel_names) -> list[str]:
+
+    prefixes = []
+    for name in channel_names:
+        prefix = name.rpartition(".")[0]
+        if prefix not in prefixes:
+            prefixes.append(prefix)
+    return prefixes
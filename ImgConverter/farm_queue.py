@@ -0,0 +1,616 @@
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import argparse
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+sys.path.append(os.path.dirname(__file__))
+
+import converter_constants as constants
+import batch_converter
+import ffmpeg_handler as ffmpeg
+import file_handler as handler
+from job_executor import JobExecutor
+from HANLib import init_logger
+
+# Set Logger
+log_name = "farm_queue"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+CONVERT = "convert"
+JOIN = "join"
+
+
+class FarmQueue():
+    """Conversion jobs in a SQLite file shared by workers on several machines.
+
+    Every state change runs in a BEGIN IMMEDIATE transaction, so two
+    workers can't claim the same job. The file uses the rollback journal,
+    WAL needs shared memory that network shares don't provide.
+    """
+    def __init__(self, db_path: str, lease_seconds=None):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds or constants.FARM_LEASE_SECONDS
+        self.lock = threading.Lock()
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.db_path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self.create_table()
+
+    def create_table(self):
+        with self.transaction():
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "batch TEXT NOT NULL, "
+                "kind TEXT NOT NULL, "
+                "spec TEXT NOT NULL, "
+                "status TEXT NOT NULL, "
+                "attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, "
+                "worker TEXT, "
+                "lease_until REAL, "
+                "not_before REAL NOT NULL DEFAULT 0, "
+                "progress INTEGER NOT NULL DEFAULT 0, "
+                "error TEXT, "
+                "result TEXT, "
+                "created REAL NOT NULL, "
+                "started REAL, "
+                "finished REAL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, not_before)"
+            )
+
+    @contextmanager
+    def transaction(self):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def submit(self, jobs: list[tuple[str, dict]], max_attempts=None) -> str:
+        """Add (kind, spec) jobs as one batch and return the batch id."""
+        batch = uuid.uuid4().hex[:12]
+        max_attempts = max_attempts or constants.FARM_MAX_ATTEMPTS
+        now = time.time()
+        with self.transaction():
+            self.conn.executemany(
+                "INSERT INTO jobs (batch, kind, spec, status, max_attempts, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(batch, kind, json.dumps(spec), QUEUED, max_attempts, now)
+                 for kind, spec in jobs]
+            )
+        LOGGER.info(f"Submitted batch {batch} with {len(jobs)} job(s).")
+        return batch
+
+    def claim(self, worker: str) -> dict | None:
+        """Lease the oldest runnable job to worker, None if there is none.
+
+        A join job only runs once every chunk of its batch is done.
+        """
+        now = time.time()
+        with self.transaction():
+            self.expire_leases(now)
+            row = self.conn.execute(
+                "SELECT id, batch, kind, spec, attempts FROM jobs "
+                "WHERE status = ? AND not_before <= ? AND (kind != ? OR NOT EXISTS ("
+                "SELECT 1 FROM jobs AS part WHERE part.batch = jobs.batch "
+                "AND part.kind = ? AND part.status != ?)) "
+                "ORDER BY id LIMIT 1",
+                (QUEUED, now, JOIN, CONVERT, DONE)
+            ).fetchone()
+            if row is None:
+                return None
+
+            job_id, batch, kind, spec, attempts = row
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, "
+                "attempts = attempts + 1, progress = 0, started = ? WHERE id = ?",
+                (RUNNING, worker, now + self.lease_seconds, now, job_id)
+            )
+
+        return {
+            "id": job_id,
+            "batch": batch,
+            "kind": kind,
+            "spec": json.loads(spec),
+            "attempt": attempts + 1,
+        }
+
+    def heartbeat(self, job_id: int, worker: str, progress=0) -> bool:
+        """Renew the lease, False once the job was cancelled or taken over."""
+        with self.transaction():
+            cursor = self.conn.execute(
+                "UPDATE jobs SET lease_until = ?, progress = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (time.time() + self.lease_seconds, progress, job_id, worker, RUNNING)
+            )
+        return cursor.rowcount == 1
+
+    def complete(
+            self, job_id: int, worker: str, result: dict, attempt_path=None, output=None
+    ) -> bool:
+        """Mark the job done, False if worker no longer holds its lease.
+
+        attempt_path is moved to output inside the transaction, so only
+        the lease holder ever replaces the final file.
+        """
+        now = time.time()
+        with self.transaction():
+            row = self.conn.execute(
+                "SELECT batch, attempts, max_attempts FROM jobs "
+                "WHERE id = ? AND worker = ? AND status = ? AND lease_until >= ?",
+                (job_id, worker, RUNNING, now)
+            ).fetchone()
+            if row is None:
+                return False
+
+            if attempt_path and attempt_path != output:
+                try:
+                    os.replace(attempt_path, output)
+                except OSError as e:
+                    self.retry_or_fail(job_id, *row, f"Failed to move output: {e}", now)
+                    return False
+
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, progress = 100, result = ?, error = NULL, "
+                "finished = ? WHERE id = ?",
+                (DONE, json.dumps(result), now, job_id)
+            )
+        return True
+
+    def fail(self, job_id: int, worker: str, error: str, retry=True):
+        """Queue the job again unless it ran out of attempts or retry is False."""
+        now = time.time()
+        with self.transaction():
+            row = self.conn.execute(
+                "SELECT batch, attempts, max_attempts FROM jobs "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (job_id, worker, RUNNING)
+            ).fetchone()
+            if row is None:
+                return
+            batch, attempts, max_attempts = row
+            if not retry:
+                attempts = max_attempts
+            self.retry_or_fail(job_id, batch, attempts, max_attempts, error, now)
+
+    def expire_leases(self, now: float):
+        # Workers that died or lost the share stop renewing their leases.
+        rows = self.conn.execute(
+            "SELECT id, batch, attempts, max_attempts, worker FROM jobs "
+            "WHERE status = ? AND lease_until < ?", (RUNNING, now)
+        ).fetchall()
+        for job_id, batch, attempts, max_attempts, worker in rows:
+            LOGGER.warning(f"Lease of job {job_id} expired on {worker}.")
+            self.retry_or_fail(
+                job_id, batch, attempts, max_attempts, f"Lease expired on {worker}.", now
+            )
+
+    def retry_or_fail(self, job_id, batch, attempts, max_attempts, error, now):
+        if attempts < max_attempts:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_until = NULL, "
+                "error = ?, not_before = ? WHERE id = ?",
+                (QUEUED, error, now + constants.FARM_RETRY_DELAY * attempts, job_id)
+            )
+            return
+
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+            (FAILED, error, now, job_id)
+        )
+        # The join of a batch can't run without all of its chunks.
+        self.conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished = ? "
+            "WHERE batch = ? AND kind = ? AND status = ?",
+            (FAILED, f"Chunk job {job_id} failed.", now, batch, JOIN, QUEUED)
+        )
+
+    def retry_failed(self, batch=None) -> int:
+        with self.transaction():
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, attempts = 0, not_before = 0, worker = NULL "
+                "WHERE status IN (?, ?) AND (? IS NULL OR batch = ?)",
+                (QUEUED, FAILED, CANCELLED, batch, batch)
+            )
+        return cursor.rowcount
+
+    def cancel(self, batch=None) -> int:
+        # Running jobs stop when their worker's next heartbeat is refused.
+        with self.transaction():
+            cursor = self.conn.execute(
+                "UPDATE jobs SET status = ?, finished = ? "
+                "WHERE status IN (?, ?) AND (? IS NULL OR batch = ?)",
+                (CANCELLED, time.time(), QUEUED, RUNNING, batch, batch)
+            )
+        return cursor.rowcount
+
+    def jobs(self, batch=None) -> list[dict]:
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, batch, kind, status, attempts, worker, progress, error, "
+                "result, spec FROM jobs WHERE (? IS NULL OR batch = ?) ORDER BY id",
+                (batch, batch)
+            ).fetchall()
+
+        jobs = []
+        for job_id, batch, kind, status, attempts, worker, progress, error, result, spec in rows:
+            jobs.append({
+                "id": job_id,
+                "batch": batch,
+                "kind": kind,
+                "status": status,
+                "attempts": attempts,
+                "worker": worker,
+                "progress": progress,
+                "error": error,
+                "result": json.loads(result) if result else None,
+                "output": json.loads(spec).get("output"),
+            })
+        return jobs
+
+    def has_pending(self) -> bool:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT 1 FROM jobs WHERE status IN (?, ?) LIMIT 1", (QUEUED, RUNNING)
+            ).fetchone()
+        return row is not None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class FarmWorker():
+    """Claim and run jobs from a FarmQueue, slots jobs at a time."""
+    def __init__(self, queue: FarmQueue, name=None, slots=1, drain=False):
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.slots = max(1, slots)
+        self.drain = drain
+        self.stop_event = threading.Event()
+
+    def run(self):
+        LOGGER.info(f"Worker {self.name} started with {self.slots} slot(s).")
+        threads = [
+            threading.Thread(target=self.loop, args=(f"{self.name}/{i}",), daemon=True)
+            for i in range(self.slots)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+        LOGGER.info(f"Worker {self.name} stopped.")
+
+    def loop(self, worker: str):
+        while not self.stop_event.is_set():
+            try:
+                job = self.queue.claim(worker)
+            except sqlite3.Error as e:
+                LOGGER.warning(f"Failed to claim a job: {e}")
+                job = None
+
+            if job is None:
+                if self.drain and not self.queue.has_pending():
+                    return
+                self.stop_event.wait(constants.FARM_POLL_INTERVAL)
+                continue
+            self.run_job(job, worker)
+
+    def run_job(self, job: dict, worker: str):
+        LOGGER.info(f"{worker} runs job {job['id']} ({job['kind']}), attempt {job['attempt']}.")
+        start_time = time.monotonic()
+        status = {"percent": 0}
+        # The lease is renewed from the start, scanning a large plate in
+        # build can take longer than a lease.
+        lease = {"lost": threading.Event(), "executor": None}
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self.heartbeat,
+            args=(job["id"], worker, lease, status, stop_heartbeat),
+            daemon=True
+        )
+        heartbeat.start()
+        try:
+            try:
+                conversion = self.build(job, worker)
+            except (OSError, ValueError, ffmpeg.ConversionError) as e:
+                # Same inputs, same error on every node.
+                self.write(self.queue.fail, job["id"], worker, str(e), retry=False)
+                return
+
+            executor = JobExecutor(conversion, status.update)
+            lease["executor"] = executor
+            if lease["lost"].is_set():
+                executor.cancel()
+            success, error = executor.run()
+        finally:
+            stop_heartbeat.set()
+            heartbeat.join()
+
+        if executor.cancelled:
+            LOGGER.info(f"Job {job['id']} was cancelled or taken over.")
+            return
+        if not success:
+            self.write(self.queue.fail, job["id"], worker, error)
+            return
+
+        attempt_path = conversion["save_path"]
+        output = job["spec"]["output"]
+        completed = self.write(self.queue.complete, job["id"], worker, {
+            "output": output,
+            "seconds": round(time.monotonic() - start_time, 3),
+            "worker": worker,
+        }, attempt_path, output)
+        if not completed:
+            LOGGER.info(f"Job {job['id']} was taken over, output dropped.")
+            if attempt_path != output:
+                self.remove_parts([attempt_path])
+            return
+
+        if job["kind"] == JOIN:
+            self.remove_parts(job["spec"]["parts"])
+
+    def build(self, job: dict, worker: str) -> dict:
+        spec = job["spec"]
+        attempt_path = get_attempt_path(spec["output"], worker, job["attempt"])
+        if job["kind"] == JOIN:
+            txt_file_path = f"{os.path.splitext(attempt_path)[0]}.txt"
+            cmd = ffmpeg.set_concat_cmd(spec["parts"], attempt_path, txt_file_path)
+            if not cmd:
+                raise ffmpeg.ConversionError("Failed to create ffmpeg command.")
+            return {"cmd": cmd, "save_path": attempt_path, "txt_file_path": txt_file_path}
+
+        records = batch_converter.build_jobs({**spec, "output": attempt_path})
+        if len(records) != 1 or not records[0]["job"]:
+            raise ffmpeg.ConversionError(records[0]["error"] if records else "No inputs.")
+        conversion = records[0]["job"]
+        conversion["workers"] = max(1, constants.NATIVE_IMAGE_WORKERS // self.slots)
+        return conversion
+
+    def write(self, method, *args, **kwargs):
+        """Call a FarmQueue write, retrying while the database is unreachable.
+
+        Returns what method returns, None if it never got through.
+        """
+        delay = 1.0
+        for attempt in range(1, constants.FARM_WRITE_RETRIES + 1):
+            try:
+                return method(*args, **kwargs)
+            except sqlite3.Error as e:
+                LOGGER.warning(f"Queue {method.__name__} failed, try {attempt}: {e}")
+            if attempt < constants.FARM_WRITE_RETRIES:
+                time.sleep(delay)
+                delay *= 2
+
+        # The lease runs out and another worker takes the job again.
+        LOGGER.error(f"Queue {method.__name__} of job {args[0]} was not written.")
+        return None
+
+    def heartbeat(self, job_id, worker, lease, status, stop_event):
+        renewed = time.monotonic()
+        while not stop_event.wait(constants.FARM_HEARTBEAT_SECONDS):
+            try:
+                alive = self.queue.heartbeat(job_id, worker, status.get("percent", 0))
+            except sqlite3.Error as e:
+                # The share may be back before the lease runs out, after
+                # that another worker may already run the job.
+                LOGGER.warning(f"Heartbeat of job {job_id} failed: {e}")
+                if time.monotonic() - renewed >= self.queue.lease_seconds:
+                    LOGGER.error(f"Lease of job {job_id} ran out, cancelling it.")
+                    self.drop_lease(lease)
+                    return
+                continue
+            if not alive:
+                self.drop_lease(lease)
+                return
+            renewed = time.monotonic()
+
+    def drop_lease(self, lease: dict):
+        # run_job checks lost once its executor exists, so either side
+        # cancels it, whichever comes second.
+        lease["lost"].set()
+        if lease["executor"] is not None:
+            lease["executor"].cancel()
+
+    def remove_parts(self, parts: list[str]):
+        for part in parts:
+            try:
+                os.remove(part)
+            except OSError as e:
+                LOGGER.warning(f"Failed to remove chunk: {part} {e}")
+
+
+def get_attempt_path(output: str, worker: str, attempt: int) -> str:
+    """Name a worker writes output to until FarmQueue.complete moves it.
+
+    Image sequence outputs keep their pattern, frames are written one by
+    one and a taken over job just writes them again.
+    """
+    if "%" in output:
+        return output
+    stem, ext = os.path.splitext(output)
+    tag = re.sub(r"[^\w-]", "_", worker)
+    return f"{stem}.{tag}.{attempt}{ext}"
+
+def plan_jobs(spec: dict, chunk_frames=None) -> list[tuple[str, dict]]:
+    """Split a batch job spec into (kind, spec) farm jobs.
+
+    Every output becomes a convert job with a fixed output path. A video
+    of a single sequence longer than chunk_frames is encoded in chunks,
+    one job each, plus a join job.
+    """
+    spec = batch_converter.normalize_spec(spec)
+    # Workers run in other folders and on other nodes.
+    spec["inputs"] = [os.path.abspath(path) for path in spec["inputs"]]
+    if spec["output"]:
+        output = os.path.abspath(spec["output"])
+        if spec["output"].endswith(("/", os.sep)):
+            output = os.path.join(output, "")
+        spec["output"] = output
+    chunk_frames = constants.FARM_CHUNK_FRAMES if chunk_frames is None else chunk_frames
+    checked_items, _ = batch_converter.scan_inputs(spec["inputs"])
+    if not checked_items:
+        raise ValueError("No images found in inputs.")
+
+    groups = (
+        [{key: entry} for key, entry in checked_items.items()]
+        if spec["separate"] else [checked_items]
+    )
+    base = {k: v for k, v in spec.items() if k not in ("inputs", "output", "separate")}
+
+    jobs = []
+    used = set()
+    for items in groups:
+        sequences, non_seq_paths = handler.parse_path_by_type(items)
+        output = ffmpeg.get_unique_output_path(
+            batch_converter.get_output_path(spec, sequences, non_seq_paths, len(groups) > 1),
+            used
+        )
+        if len(groups) == 1:
+            inputs = spec["inputs"]
+        else:
+            inputs = handler.get_sequence_paths(sequences) + non_seq_paths
+
+        if (
+            chunk_frames and len(sequences) == 1 and not non_seq_paths
+            and spec["format"] in constants.OUTPUT_VIDEO_FORMAT
+            and len(sequences[0]) > chunk_frames and not sequences[0].gaps()
+        ):
+            jobs.extend(plan_chunks(base, sequences[0], output, chunk_frames))
+        else:
+            jobs.append((CONVERT, {**base, "inputs": inputs, "output": output}))
+    return jobs
+
+def plan_chunks(base: dict, sequence, output: str, chunk_frames: int) -> list[tuple[str, dict]]:
+
+    stem, ext = os.path.splitext(output)
+    chunk_count = -(-len(sequence) // chunk_frames)
+    jobs, parts = [], []
+    index = 0
+    for i, (_, frame_count) in enumerate(
+        ffmpeg.split_frame_range(sequence.start, len(sequence), chunk_count)
+    ):
+        part = f"{stem}.part{i:03d}{ext}"
+        paths = [sequence.path(j) for j in range(index, index + frame_count)]
+        index += frame_count
+        jobs.append((CONVERT, {**base, "inputs": paths, "output": part, "segments": 1}))
+        parts.append(part)
+    jobs.append((JOIN, {"parts": parts, "output": output}))
+    return jobs
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="run_converter.py --farm",
+        description="Share conversions between worker processes through a queue file."
+    )
+    parser.add_argument(
+        "--db", default=constants.FARM_QUEUE_PATH,
+        help="Queue file on a share, defaults to $IMGCONVERTER_FARM_DB."
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    submit = commands.add_parser("submit", help="Queue a conversion.")
+    submit.add_argument("inputs", nargs="*", help="Image files or directories.")
+    submit.add_argument("--spec", help="JSON or YAML job spec, replaces the options below.")
+    submit.add_argument("--format", choices=constants.OUTPUT_FORMAT, default="mov")
+    submit.add_argument("--codec")
+    submit.add_argument("--frame-rate", default="23.976")
+    submit.add_argument("--resize")
+    submit.add_argument("--output")
+    submit.add_argument("--separate", action="store_true")
+    submit.add_argument("--chunk-frames", type=int, default=constants.FARM_CHUNK_FRAMES,
+                        help="Frames per chunk of a video, 0 keeps one job per output.")
+    submit.add_argument("--max-attempts", type=int, default=constants.FARM_MAX_ATTEMPTS)
+
+    worker = commands.add_parser("worker", help="Run queued jobs.")
+    worker.add_argument("--slots", type=int, default=1, help="Jobs run at once.")
+    worker.add_argument("--name", help="Worker name, defaults to host:pid.")
+    worker.add_argument("--drain", action="store_true", help="Exit once the queue is empty.")
+
+    for name, help in (("status", "Print jobs as JSON."), ("retry", "Queue failed jobs again."),
+                       ("cancel", "Cancel queued and running jobs.")):
+        command = commands.add_parser(name, help=help)
+        command.add_argument("--batch")
+
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+
+    args = parse_args(argv)
+    if not args.db:
+        print(json.dumps({"success": False, "error": "No queue file, use --db."}))
+        return 2
+
+    queue = FarmQueue(args.db)
+    try:
+        if args.command == "submit":
+            try:
+                if args.spec:
+                    specs = batch_converter.load_spec(args.spec)
+                else:
+                    specs = [{
+                        "inputs": args.inputs, "format": args.format,
+                        "codec": args.codec, "frame_rate": args.frame_rate,
+                        "resize": args.resize, "output": args.output,
+                        "separate": args.separate,
+                    }]
+                jobs = [job for spec in specs for job in plan_jobs(spec, args.chunk_frames)]
+            except (OSError, ValueError, ffmpeg.ConversionError) as e:
+                print(json.dumps({"success": False, "error": str(e)}))
+                return 2
+            batch = queue.submit(jobs, args.max_attempts)
+            print(json.dumps({"success": True, "batch": batch, "jobs": len(jobs)}))
+
+        elif args.command == "worker":
+            FarmWorker(queue, args.name, args.slots, args.drain).run()
+
+        elif args.command == "status":
+            jobs = queue.jobs(args.batch)
+            counts = {}
+            for job in jobs:
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            print(json.dumps({"counts": counts, "jobs": jobs}, indent=2))
+
+        elif args.command == "retry":
+            print(json.dumps({"requeued": queue.retry_failed(args.batch)}))
+
+        elif args.command == "cancel":
+            print(json.dumps({"cancelled": queue.cancel(args.batch)}))
+    finally:
+        queue.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,15 @@
 import os
+import re
 import sys
+import shlex
 import subprocess
 from pathlib import Path
 
-from qt_compat import QMessageBox
 import file_handler as handler
+import frame_feeder
+import image_engine
+import exr_layers
+from frame_sequence import missing_ranges, format_ranges
 import converter_constants as constants
 from HANLib import init_logger
 
@@ -14,13 +19,63 @@ log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
 log_path = str(Path(log_dir) / f"{log_name}.log")
 LOGGER = init_logger.Logger(log_name, log_path)
 
+
+class ConversionError(Exception):
+    """A conversion that can't be built, str() is the message for the user."""
+
+
+class MissingFramesError(ConversionError):
+    def __init__(self, gaps: str):
+        super().__init__(
+            f"The selected sequence has missing frames: {gaps}\n"
+            f"Please select a complete sequence."
+        )
+        self.gaps = gaps
+
+
 def run_conversion(
         save_path, output_format, checked_items, frame_rate=None, 
-        codec=None, resize=None
+        codec=None, resize=None, on_progress=None, **options
+) -> dict:
+    """Build and run one conversion in the calling thread.
+
+    options go to build_conversion, on_progress gets get_progress_status
+    dicts. Returns {"success", "error", "save_path", "cmd"} and raises
+    ConversionError when no command can be built.
+    """
+    # job_executor imports this module, load it once both are initialized.
+    from job_executor import JobExecutor
+
+    job = build_conversion(
+        save_path, output_format, checked_items, frame_rate=frame_rate,
+        codec=codec, resize=resize, **options
+    )
+    success, error = JobExecutor(job, on_progress).run()
+
+    return {
+        "success": success,
+        "error": error,
+        "save_path": save_path,
+        "cmd": job["cmd"],
+    }
+
+def build_conversion(
+        save_path, output_format, checked_items, frame_rate=None, 
+        codec=None, resize=None, max_segments=1, raw_feed=False, native=False,
+        layer=None
 ):
+    """Return the job dict for the checked items.
+
+    Raises ConversionError, e.g. MissingFramesError for a sequence with gaps.
+    """
     cmd = ""
+    feed = None
+    frames = []
+    segment_cmds, segment_paths = [], []
     txt_file_path = save_path.replace(f".{output_format}", ".txt")
-    seq_paths, non_seq_paths = handler.parse_path_by_type(checked_items)
+    txt_file_path = re.sub(r"%\d*d\.?", "", txt_file_path)
+    sequences, non_seq_paths = handler.parse_path_by_type(checked_items)
+    total_frames = sum(len(sequence) for sequence in sequences) + len(non_seq_paths)
     resize_cmd = get_resize_cmd(resize)
 
     if output_format in constants.OUTPUT_VIDEO_FORMAT:
@@ -33,53 +88,94 @@ def run_conversion(
                 codec_cmd = codec_data.get("codec")
                 break
 
-        if seq_paths and non_seq_paths:
-            paths = seq_paths + non_seq_paths
+        if sequences and (non_seq_paths or len(sequences) > 1):
+            paths = handler.get_sequence_paths(sequences) + non_seq_paths
             cmd = set_none_seq_to_video_cmd(
                 paths, save_path, frame_rate, txt_file_path, codec_cmd, resize_cmd
             )
-        elif seq_paths and not non_seq_paths:
-            cmd = set_seq_to_video_cmd(
-                seq_paths, save_path, frame_rate, codec_cmd, resize_cmd
-            )
-        elif not seq_paths and non_seq_paths:
+        elif sequences and not non_seq_paths:
+            segment_count = get_segment_count(len(sequences[0]), max_segments)
+            if raw_feed and frame_feeder.can_feed(sequences[0]):
+                cmd, feed = set_seq_to_video_raw_cmd(
+                    sequences[0], save_path, frame_rate, codec_cmd, resize_cmd, layer
+                )
+                if not cmd:
+                    LOGGER.warning("No raw pixel format, using the ffmpeg reader.")
+
+            if not cmd and segment_count > 1:
+                segment_cmds, segment_paths, cmd = set_seq_to_video_segment_cmds(
+                    sequences[0], save_path, frame_rate, txt_file_path, 
+                    codec_cmd, resize_cmd, segment_count
+                )
+            elif not cmd:
+                cmd = set_seq_to_video_cmd(
+                    sequences[0], save_path, frame_rate, codec_cmd, resize_cmd
+                )
+        elif not sequences and non_seq_paths:
             cmd = set_none_seq_to_video_cmd(
                 non_seq_paths, save_path, frame_rate, txt_file_path, codec_cmd, resize_cmd
             )
 
+    elif output_format in constants.OUTPUT_IMAGE_FORMAT and native:
+        paths = handler.get_sequence_paths(sequences) + non_seq_paths
+        try:
+            frames = image_engine.get_output_paths(paths, save_path)
+        except ValueError as e:
+            raise ConversionError(str(e)) from e
+        total_frames = len(frames)
+
     elif output_format in constants.OUTPUT_IMAGE_FORMAT:
-        if seq_paths and non_seq_paths:
-            paths = seq_paths + non_seq_paths
+        if sequences and (non_seq_paths or len(sequences) > 1):
+            paths = handler.get_sequence_paths(sequences) + non_seq_paths
             if output_format == "exr":
                 cmd = set_none_seq_to_exr_cmd(paths, save_path, txt_file_path, resize_cmd)
             else:
                 cmd = set_none_seq_to_img_cmd(paths, save_path, txt_file_path, resize_cmd)
-        elif seq_paths and not non_seq_paths:
+        elif sequences and not non_seq_paths:
             if output_format == "exr":
-                cmd = set_seq_to_exr_cmd(seq_paths, save_path, resize_cmd)
+                cmd = set_seq_to_exr_cmd(sequences[0], save_path, resize_cmd)
             else:
-                cmd = set_seq_to_img_cmd(seq_paths, save_path, resize_cmd)
-        elif not seq_paths and non_seq_paths:
+                cmd = set_seq_to_img_cmd(sequences[0], save_path, resize_cmd)
+        elif not sequences and non_seq_paths:
             if output_format == "exr":
                 cmd = set_none_seq_to_exr_cmd(non_seq_paths, save_path, txt_file_path, resize_cmd)
             else:
                 cmd = set_none_seq_to_img_cmd(non_seq_paths, save_path, txt_file_path, resize_cmd)
 
 
-    if not cmd:
+    if not cmd and not frames:
         LOGGER.error("Failed to create ffmpeg command.")
-        QMessageBox.critical(
-            None, "Error", "Failed to create ffmpeg command."
-        )
-        return False
-
-    LOGGER.info(f"Executing command: {cmd}")
-    execute_cmd(cmd, os.path.dirname(save_path))
+        raise ConversionError("Failed to create ffmpeg command.")
 
-    if os.path.exists(txt_file_path):
+    if _has_exr_input(sequences, non_seq_paths) and not feed:
+        layer_args = exr_layers.get_layer_args(layer)
+        if segment_cmds:
+            segment_cmds = [add_input_args(c, layer_args) for c in segment_cmds]
+        else:
+            cmd = add_input_args(cmd, layer_args)
+
+    return {
+        "cmd": cmd,
+        "save_path": save_path,
+        "txt_file_path": txt_file_path,
+        "total_frames": total_frames,
+        "segment_cmds": segment_cmds,
+        "segment_paths": segment_paths,
+        "feed": feed,
+        "frames": frames,
+        "size": get_resize_size(resize),
+        "layer": layer,
+    }
+
+def cleanup_job(job: dict):
+
+    txt_file_path = job.get("txt_file_path")
+    if txt_file_path and os.path.exists(txt_file_path):
         os.remove(txt_file_path)
 
-    return True
+    for segment_path in job.get("segment_paths", []):
+        if os.path.exists(segment_path):
+            os.remove(segment_path)
 
 def set_none_seq_to_video_cmd(
         paths, save_path, frame_rate, txt_file_path, codec_cmd, resize_cmd
@@ -102,17 +198,17 @@ def set_none_seq_to_video_cmd(
     return cmd
 
 def set_seq_to_video_cmd(
-        seq_paths, save_path, frame_rate, codec_cmd, resize_cmd
+        sequence, save_path, frame_rate, codec_cmd, resize_cmd,
+        start_frame=None, frame_count=None
     ):
 
-    frames = handler.get_frames(seq_paths)
-    valid = _validate_frame_number(frames)
-    if not valid:
-        return None
+    _validate_frame_number(sequence.frames)
     
-    input_ext = Path(seq_paths[0]).suffix.lstrip(".")
-    input_padding_path = handler.get_padding_path(seq_paths, input_ext)
-    start_frame = sorted(frames)[0]
+    input_padding_path = sequence.padding_path()
+    if start_frame is None:
+        start_frame = sequence.start
+    if frame_count is None:
+        frame_count = len(sequence)
 
     cmd = (
         f'ffmpeg '
@@ -120,7 +216,7 @@ def set_seq_to_video_cmd(
         f'-start_number {start_frame} '
         f'-framerate {frame_rate} '
         f'-i "{input_padding_path}" '
-        f'-vframes {len(frames)} '
+        f'-vframes {frame_count} '
         f'-c:v {codec_cmd} {resize_cmd} '
         f'-r {frame_rate} '
         f'{save_path}'
@@ -128,24 +224,109 @@ def set_seq_to_video_cmd(
 
     return cmd
 
-def set_seq_to_exr_cmd(seq_paths, save_path, resize_cmd):
+def set_seq_to_video_raw_cmd(
+        sequence, save_path, frame_rate, codec_cmd, resize_cmd, layer=None
+    ):
+
+    _validate_frame_number(sequence.frames)
+
+    raw_format = frame_feeder.get_raw_format(sequence.path(0), layer)
+    if not raw_format:
+        return None, None
+    pix_fmt, width, height = raw_format
+
+    # Frames arrive on stdin already decoded, see frame_feeder.FrameFeeder.
+    cmd = (
+        f'ffmpeg '
+        f'-y '
+        f'-f rawvideo -pix_fmt {pix_fmt} -s {width}x{height} '
+        f'-framerate {frame_rate} '
+        f'-i pipe:0 '
+        f'-c:v {codec_cmd} {resize_cmd} '
+        f'-r {frame_rate} '
+        f'{save_path}'
+    )
+    feed = frame_feeder.FrameFeeder(sequence, pix_fmt, width, height, layer=layer)
+
+    return cmd, feed
+
+def set_seq_to_video_segment_cmds(
+        sequence, save_path, frame_rate, txt_file_path, codec_cmd, resize_cmd,
+        segment_count
+    ):
+
+    _validate_frame_number(sequence.frames)
+
+    # Every segment has to start on a keyframe and must not reference
+    # frames of its neighbours so the parts join with stream copy.
+    if "libx264" in codec_cmd:
+        codec_cmd = f"{codec_cmd} -flags +cgop"
 
-    frames = handler.get_frames(seq_paths)
-    valid = _validate_frame_number(frames)
-    if not valid:
+    save_stem, save_ext = os.path.splitext(save_path)
+    segment_cmds, segment_paths = [], []
+    for i, (start_frame, frame_count) in enumerate(
+        split_frame_range(sequence.start, len(sequence), segment_count)
+    ):
+        segment_path = f"{save_stem}.part{i:03d}{save_ext}"
+        segment_cmds.append(set_seq_to_video_cmd(
+            sequence, segment_path, frame_rate, codec_cmd, resize_cmd,
+            start_frame=start_frame, frame_count=frame_count
+        ))
+        segment_paths.append(segment_path)
+
+    cmd = set_concat_cmd(segment_paths, save_path, txt_file_path)
+    if not cmd:
+        return [], [], None
+
+    return segment_cmds, segment_paths, cmd
+
+def set_concat_cmd(segment_paths, save_path, txt_file_path):
+    """Join encoded parts with stream copy, they must share codec settings."""
+
+    made = make_image_list(segment_paths, txt_file_path)
+    if not made:
         return None
 
-    start_frame = sorted(frames)[0]
-    input_ext = Path(seq_paths[0]).suffix.lstrip(".")
-    input_padding_path = handler.get_padding_path(seq_paths, input_ext)
+    cmd = (
+        f'ffmpeg '
+        f'-y '
+        f'-f concat -safe 0 '
+        f'-i "{txt_file_path}" '
+        f'-c copy '
+        f'{save_path}'
+    )
+
+    return cmd
+
+def split_frame_range(start_frame: int, frame_count: int, segment_count: int):
+
+    segment_count = max(1, min(segment_count, frame_count))
+    size, extra = divmod(frame_count, segment_count)
+
+    chunks = []
+    for i in range(segment_count):
+        count = size + (1 if i < extra else 0)
+        chunks.append((start_frame, count))
+        start_frame += count
+    return chunks
+
+def get_segment_count(frame_count: int, max_segments=1) -> int:
+
+    return max(1, min(max_segments, frame_count // constants.SEGMENT_MIN_FRAMES))
+
+def set_seq_to_exr_cmd(sequence, save_path, resize_cmd):
+
+    _validate_frame_number(sequence.frames)
+
+    input_padding_path = sequence.padding_path()
 
     cmd = (
         f'ffmpeg '
         f'-y '
-        f'-start_number {start_frame} '
+        f'-start_number {sequence.start} '
         f'-i "{input_padding_path}" '
         f'{resize_cmd} '
-        f'-vframes {len(frames)} '
+        f'-vframes {len(sequence)} '
         f'-c:v exr -pix_fmt rgb48 '
         f'{save_path}'
     )
@@ -153,7 +334,6 @@ def set_seq_to_exr_cmd(seq_paths, save_path, resize_cmd):
 
 def set_none_seq_to_exr_cmd(paths, save_path, txt_file_path, resize_cmd):
 
-    import re
     pattern =  r"%\d*d\.?"
     if re.search(pattern, txt_file_path):
         txt_file_path = re.sub(pattern, "", txt_file_path)
@@ -173,24 +353,19 @@ def set_none_seq_to_exr_cmd(paths, save_path, txt_file_path, resize_cmd):
     )
     return cmd
 
-def set_seq_to_img_cmd(seq_paths, save_path, resize_cmd):
+def set_seq_to_img_cmd(sequence, save_path, resize_cmd):
 
-    frames = handler.get_frames(seq_paths)
-    valid = _validate_frame_number(frames)
-    if not valid:
-        return None
+    _validate_frame_number(sequence.frames)
 
-    start_frame = sorted(frames)[0]
-    input_ext = Path(seq_paths[0]).suffix.lstrip(".")
-    input_padding_path = handler.get_padding_path(seq_paths, input_ext)
+    input_padding_path = sequence.padding_path()
 
     cmd = (
         f'ffmpeg '
         f'-y '
-        f'-start_number {start_frame} '
+        f'-start_number {sequence.start} '
         f'-i "{input_padding_path}" '
         f'{resize_cmd} '
-        f'-vframes {len(frames)} '
+        f'-vframes {len(sequence)} '
         f'-q:v 2 '
         f'{save_path}'
     )
@@ -215,8 +390,7 @@ def set_none_seq_to_img_cmd(paths, save_path, txt_file_path, resize_cmd):
 
 def get_resize_cmd(resize):
     
-    width = resize.split("(")[-1].split('x')[0]
-    height = resize.split("(")[-1].split('x')[1].split(")")[0]
+    width, height = get_resize_size(resize)
 
     resize_cmd = (
         f"-vf "
@@ -226,31 +400,171 @@ def get_resize_cmd(resize):
 
     return resize_cmd
 
-def execute_cmd(cmd, save_dir):
+def get_resize_size(resize) -> tuple[int, int]:
+
+    width = resize.split("(")[-1].split('x')[0]
+    height = resize.split("(")[-1].split('x')[1].split(")")[0]
+    return int(width), int(height)
+
+def execute_cmd(cmd) -> dict:
+    """Run cmd to the end, return {"success", "returncode", "error", "cmd"}."""
+
+    LOGGER.info(f"Executing command: {cmd}")
     try:
-        process = subprocess.Popen(cmd, shell=True)
-        process.wait()
-        
-        if process.returncode == 0:
-            LOGGER.info("Conversion completed successfully.")
-            QMessageBox.information(
-                None, "Information", "Conversion is done"
-            )
-            os_name = sys.platform
-            if os_name == "win32":
-                os.startfile(save_dir)
-            elif os_name == "darwin":
-                subprocess.run(["open", save_dir])
-        else:
-            LOGGER.error(f"Conversion failed. {cmd}")
-            QMessageBox.critical(
-                None, "Error", f"Conversion failed \n\nCommand: {cmd}"
-            )
-    except Exception as e:
-        LOGGER.error(f"Conversion failed: {e} \n\nCommand: {cmd}")
-        QMessageBox.critical(
-            None, "Error", f"Conversion failed: {e} \n\nCommand: {cmd}"
+        process = subprocess.run(
+            split_cmd(cmd), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace"
         )
+    except OSError as e:
+        LOGGER.error(f"Conversion failed: {e} \n\nCommand: {cmd}")
+        return {"success": False, "returncode": None, "error": str(e), "cmd": cmd}
+
+    if process.returncode != 0:
+        LOGGER.error(f"Conversion failed. {cmd}")
+        return {
+            "success": False,
+            "returncode": process.returncode,
+            "error": process.stderr[-2000:],
+            "cmd": cmd,
+        }
+
+    LOGGER.info("Conversion completed successfully.")
+    return {"success": True, "returncode": 0, "error": "", "cmd": cmd}
+
+def get_default_output_path(output_format, sequences, non_seq_paths) -> str:
+    """Output next to the first input, named after it."""
+
+    if output_format in constants.OUTPUT_VIDEO_FORMAT:
+        if sequences:
+            first_file_name = sequences[0].prefix
+            dir = Path(sequences[0].directory)
+            return str(dir / f"{first_file_name}.{output_format}")
+        if non_seq_paths:
+            first_file_name = Path(non_seq_paths[0]).stem
+            dir = Path(non_seq_paths[0]).parent
+            return str(dir / f"{first_file_name}.{output_format}")
+
+    elif output_format in constants.OUTPUT_IMAGE_FORMAT:
+        if sequences:
+            return sequences[0].padding_path(output_format)
+        if non_seq_paths:
+            return handler.get_padding_path(
+                non_seq_paths, output_format, frame_padding=4
+            )
+
+    return ""
+
+def get_unique_output_path(output_path: str, used: set) -> str:
+    """Return output_path, numbered if another job already writes it.
+
+    used holds the normalized paths handed out so far and is updated.
+    """
+    path = Path(output_path)
+    if "%" in path.name:
+        stem = path.name.split("%", 1)[0].rstrip("._")
+    else:
+        stem = path.stem
+    rest = path.name[len(stem):]
+
+    candidate = output_path
+    count = 1
+    while os.path.normcase(candidate) in used:
+        candidate = str(path.with_name(f"{stem}_{count}{rest}"))
+        count += 1
+    used.add(os.path.normcase(candidate))
+    return candidate
+
+def get_max_concurrent_jobs(output_format, codec=None, job_count=1) -> int:
+
+    if output_format in constants.OUTPUT_VIDEO_FORMAT:
+        threads = constants.CODEC_THREADS.get(codec, 4)
+    else:
+        threads = constants.IMAGE_OUTPUT_THREADS
+
+    cpu_count = os.cpu_count() or 1
+    max_jobs = max(1, cpu_count // threads)
+    return max(1, min(max_jobs, constants.MAX_CONCURRENT_JOBS, job_count))
+
+def open_directory(save_dir):
+
+    os_name = sys.platform
+    if os_name == "win32":
+        os.startfile(save_dir)
+    elif os_name == "darwin":
+        subprocess.run(["open", save_dir])
+
+def add_progress_args(cmd: str) -> str:
+
+    # Machine readable key=value progress on stdout, no stats line on stderr.
+    return cmd.replace("ffmpeg ", "ffmpeg -progress pipe:1 -nostats ", 1)
+
+def add_input_args(cmd: str, args: str) -> str:
+
+    if not cmd or not args:
+        return cmd
+    return cmd.replace(" -i ", f" {args} -i ", 1)
+
+def join_cmd(args) -> str:
+
+    if isinstance(args, str):
+        return args
+    return shlex.join(args)
+
+def split_cmd(cmd: str):
+
+    # Without a shell in between, killing the process stops ffmpeg itself.
+    # CreateProcess takes the quoted command line as is on Windows.
+    if sys.platform == "win32":
+        return cmd
+    return shlex.split(cmd)
+
+def parse_progress_line(line: str, values: dict) -> dict | None:
+    """Collect one ffmpeg -progress line, return a status once a block ends."""
+
+    key, sep, value = line.strip().partition("=")
+    if not sep:
+        return None
+
+    values[key] = value
+    if key != "progress":
+        return None
+
+    status = dict(values)
+    values.clear()
+    return status
+
+def get_progress_status(values: dict, total_frames: int, elapsed: float) -> dict:
+
+    frame = to_number(values.get("frame"), int) or 0
+    fps = to_number(values.get("fps"), float) or 0.0
+    speed = values.get("speed", "N/A").strip()
+    out_time = values.get("out_time", "")
+
+    percent = 0
+    eta = None
+    if total_frames:
+        percent = min(100, int(frame * 100 / total_frames))
+        remaining = max(0, total_frames - frame)
+        if fps > 0:
+            eta = remaining / fps
+        elif frame > 0 and elapsed > 0:
+            eta = remaining * elapsed / frame
+
+    return {
+        "frame": frame,
+        "fps": fps,
+        "speed": speed,
+        "out_time": out_time,
+        "percent": percent,
+        "eta": eta,
+        "done": values.get("progress") == "end",
+    }
+
+def to_number(value, cast):
+    try:
+        return cast(value)
+    except (TypeError, ValueError):
+        return None
 
 def make_image_list(paths: list[str], text_path: str):
 
@@ -263,21 +577,22 @@ def make_image_list(paths: list[str], text_path: str):
 
     return True
 
-def _validate_frame_number(frames: list[str]) -> bool:
+def _has_exr_input(sequences, non_seq_paths) -> bool:
+
+    return (
+        any(sequence.ext.lower() == "exr" for sequence in sequences)
+        or any(path.lower().endswith(".exr") for path in non_seq_paths)
+    )
+
+def _validate_frame_number(frames):
 
     if not frames:
-        return False
+        raise ConversionError("No frames selected.")
 
-    frames = sorted([int(f) for f in frames])
-    if frames != list(range(min(frames), max(frames) + 1)):
+    gaps = missing_ranges(int(f) for f in frames)
+    if gaps:
+        gaps = format_ranges(gaps)
         LOGGER.warning(
-            "The selected sequence has missing frames."
+            f"The selected sequence has missing frames: {gaps}"
         )
-        QMessageBox.warning(
-            None, "Warning", 
-            "The selected sequence has missing frames. Please select a complete sequence."
-        )
-        return False
-    return True
-
-
+        raise MissingFramesError(gaps)
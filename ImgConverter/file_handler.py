@@ -1,10 +1,14 @@
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import OpenImageIO as oiio
 
 import converter_constants as constants
+import metadata_cache
+import image_header
+from frame_sequence import FrameSequence, group_sequences
 
 from HANLib import init_logger
 
@@ -14,46 +18,106 @@ log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
 log_path = str(Path(log_dir) / f"{log_name}.log")
 LOGGER = init_logger.Logger(log_name, log_path)
 
-def get_paths_info(paths: list[str]):
+def get_paths_info(paths: list[str], workers=None):
 
+    seq_info, none_seq_info = None, None
+    for child_seq, child_none_seq in iter_paths_info(paths, workers):
+
+        if child_seq:
+            if seq_info is None:
+                seq_info = child_seq
+            else:
+                seq_info['sequence'].update(child_seq['sequence'])
+
+        if child_none_seq:
+            none_seq_info = (
+                child_none_seq if not none_seq_info
+                else {"none_sequence": none_seq_info["none_sequence"] + child_none_seq["none_sequence"]}
+            )
+
+    return seq_info, none_seq_info
+
+def iter_paths_info(paths: list[str], workers=None):
+    """Yield (seq_info, none_seq_info) per scanned directory.
+
+    The given files are yielded first, then every directory in depth-first
+    order as soon as it has been read, so callers can show results before
+    a deep walk finishes.
+    """
     if not paths:
-        return None, None
+        return
 
     full_paths, dirs = _validate_path_or_dir(paths)
 
-    seq_info, none_seq_info = None, None
     if full_paths:
-        valid_images = _validate_image(full_paths)
-        if valid_images:
-            sequence, none_seq = _validate_sequence(valid_images)
+        info = _get_images_info(full_paths, None, workers)
+        if info:
+            yield info
+
+    stack = list(reversed(dirs))
+    # Links and junctions can lead back to a folder above, each folder is
+    # only read once.
+    visited = set()
+    while stack:
+        dir = stack.pop()
+        dir_id = get_dir_id(dir)
+        if dir_id in visited:
+            continue
+        visited.add(dir_id)
+        full_paths, sub_dirs, stats = _scan_dir(dir)
 
-            if sequence:
-                seq_info = get_file_info(sequence, "sequence")
-            if none_seq:
-                none_seq_info = get_file_info(none_seq, "none_sequence")
-    
-    if dirs:
-        for dir in dirs:
-            dir = Path(dir)
-            paths_in_dir = [str(path_in_dir) for path_in_dir in dir.iterdir()]
-
-            child_seq, child_none_seq = get_paths_info(paths_in_dir)
-
-            if child_seq:
-                if seq_info is None:
-                    seq_info = child_seq
-                else:
-                    for k, v in child_seq['sequence'].items():
-                        if k in seq_info['sequence']:
-                            seq_info['sequence'][k].extend(v) 
-                        else:
-                            seq_info['sequence'][k] = v
-
-            if child_none_seq:
-                none_seq_info = (
-                    child_none_seq if not none_seq_info
-                    else {"none_sequence": none_seq_info["none_sequence"] + child_none_seq["none_sequence"]}
-                )
+        if full_paths:
+            info = _get_images_info(full_paths, stats, workers)
+            if info:
+                yield info
+
+        stack.extend(reversed(sub_dirs))
+
+def get_dir_id(dir: str):
+    """(st_dev, st_ino) of dir, or its normalized path if it can't be read."""
+    # os.stat, the DirEntry stat has no inode number on Windows.
+    try:
+        stat = os.stat(dir)
+    except OSError:
+        return os.path.normcase(os.path.abspath(dir))
+    return stat.st_dev, stat.st_ino
+
+def _scan_dir(dir: str):
+
+    full_paths = []
+    sub_dirs = []
+    stats = {}
+    try:
+        with os.scandir(dir) as entries:
+            for entry in entries:
+                # DirEntry carries the file type from the directory listing,
+                # so no extra stat is needed to tell files from folders.
+                if entry.is_file():
+                    if os.path.splitext(entry.name)[1].lower() not in constants.INPUT_IMAGE_FORMAT:
+                        continue
+                    full_paths.append(entry.path)
+                    stats[entry.path] = entry.stat()
+                elif entry.is_dir():
+                    sub_dirs.append(entry.path)
+    except OSError as e:
+        LOGGER.warning(f"Failed to scan directory: {dir} {e}")
+
+    return sorted(full_paths), sorted(sub_dirs), stats
+
+def _get_images_info(full_paths: list[str], stats=None, workers=None):
+
+    seq_info, none_seq_info = None, None
+    valid_images = _validate_image(full_paths)
+    if valid_images:
+        sequences, none_seq = _validate_sequence(valid_images)
+
+        if sequences:
+            seq_info = get_sequence_info(sequences, workers, stats)
+        if none_seq:
+            none_seq_info = get_file_info(none_seq, "none_sequence", workers, stats)
+
+    if not seq_info and not none_seq_info:
+        return None
 
     return seq_info, none_seq_info
 
@@ -85,94 +149,194 @@ def _validate_sequence(paths: list[str]):
     if not paths:
         return None, None
     
-    pattern = r"\.(\d+)\."
+    sequences, none_seq = group_sequences(paths)
 
-    sequence = []
-    none_seq = []
-    for path in paths:
-        match = re.search(pattern, path)
+    return sequences if sequences else None, none_seq if none_seq else None
 
-        if match:
-            sequence.append(path) 
-        else:
-            none_seq.append(path)
-
-    return sequence if sequence else None, none_seq if none_seq else None
-
-def get_file_info(paths: list[str], file_type: str):
+def get_file_info(paths: list[str], file_type: str, workers=None, stats=None):
     
     if not paths:
         return None
 
+    if file_type == "sequence":
+        sequences, _ = group_sequences(paths)
+        return get_sequence_info(sequences, workers, stats)
+
     file_info = {file_type: []}
 
-    if file_type == "sequence":
-        shot_dict = {}
-        for path in paths:
-            dir_name = Path(path).parent.name
-            file_name = Path(path).name
-            image_size = _get_image_size(str(path))
-            if not image_size:
-                image_size = "N/A"
-            file_size = _get_file_size(str(path))
-            if not file_size:
-                file_size = "N/A"
-            format = Path(path).suffix.split(".")[-1]
-
-            if dir_name not in shot_dict:
-                shot_dict[dir_name] = []
-
-            shot_dict[dir_name].append({
-                "file_name": file_name,
-                "format": format,
-                "image_size": image_size,
-                "file_size": file_size,
-                "path": str(path),
-            })
-
-        file_info[file_type] = shot_dict
-
-    elif file_type == "none_sequence":
-        for image in paths:
-            image_path = Path(image)
-            file_name = str(image_path.name)
-            image_size = _get_image_size(str(image_path))
-            if not image_size:
-                image_size = "N/A"
-            file_size = _get_file_size(str(image_path))
-            if not file_size:
-                file_size = "N/A"
-            format = Path(image).suffix.split(".")[-1]
-
-            file_dic = {
-                "file_name": file_name,
-                "format": format,
-                "image_size": image_size,
-                "file_size": file_size,
-                "path": str(image_path),
-            }
-
-            file_info[file_type].append(file_dic)
+    if file_type == "none_sequence":
+        records = _probe_files(paths, workers, stats)
+        file_info[file_type] = [
+            _make_file_dic(path, record) for path, record in zip(paths, records)
+        ]
 
     return file_info
 
-def _get_image_size(path: str):
+def get_sequence_info(
+        sequences: dict[str, FrameSequence], workers=None, stats=None, fast=None
+):
+
+    if not sequences:
+        return None
+
+    if fast is None:
+        fast = constants.FAST_SCAN_ENABLED
+
+    probe_all = []
+    for sequence in sequences.values():
+        if fast and len(sequence) >= constants.FAST_SCAN_MIN_FRAMES:
+            if _sample_sequence(sequence, workers, stats):
+                continue
+        probe_all.append(sequence)
+
+    paths = []
+    for sequence in probe_all:
+        paths.extend(sequence.paths())
+    records = iter(_probe_files(paths, workers, stats))
+
+    for sequence in probe_all:
+        for i in range(len(sequence)):
+            record = next(records)
+            sequence.file_sizes[i] = record["file_size"]
+            sequence.widths[i] = record["width"] or 0
+            sequence.heights[i] = record["height"] or 0
+
+    return {"sequence": sequences}
+
+def _sample_sequence(sequence: FrameSequence, workers=None, stats=None) -> bool:
+
+    # Probe a handful of frames. If they agree, every frame gets that
+    # resolution and byte sizes come from the directory stat data.
+    indices = sample_indices(len(sequence), constants.FAST_SCAN_SAMPLES)
+    records = _probe_files([sequence.path(i) for i in indices], workers, stats)
+    sizes = {(record["width"], record["height"]) for record in records}
+    if len(sizes) != 1 or None in next(iter(sizes)):
+        return False
+
+    width, height = sizes.pop()
+    stats = stats or {}
+    for i, path in enumerate(sequence.paths()):
+        stat = stats.get(path) or os.stat(path)
+        sequence.file_sizes[i] = stat.st_size
+    sequence.fill_dimensions(width, height)
+    sequence.sampled = True
+    return True
+
+def sample_indices(frame_count: int, samples: int) -> list[int]:
+
+    if frame_count <= samples + 2:
+        return list(range(frame_count))
+    step = (frame_count - 1) / (samples + 1)
+    indices = {0, frame_count - 1}
+    indices.update(round(step * (i + 1)) for i in range(samples))
+    return sorted(indices)
+
+def probe_sequence(sequence: FrameSequence, workers=None, is_cancelled=None) -> list[dict] | None:
+    """Probe every frame, in chunks so is_cancelled can stop it.
+
+    Returns None once is_cancelled() is true.
+    """
+    paths = list(sequence.paths())
+    records = []
+    for i in range(0, len(paths), constants.PROBE_CHUNK_FILES):
+        if is_cancelled and is_cancelled():
+            return None
+        records.extend(_probe_files(paths[i:i + constants.PROBE_CHUNK_FILES], workers))
+    return records
+
+def _probe_files(paths: list[str], workers=None, stats=None) -> list[dict]:
+
+    if workers is None:
+        workers = constants.PROBE_WORKERS
+
+    stats = stats or {}
+    stats = {path: stats.get(path) or os.stat(path) for path in paths}
+    cache = metadata_cache.get_cache()
+    records = cache.get_many(stats) if cache else {}
+
+    missing = [path for path in paths if path not in records]
+    if missing:
+        # Header reads are I/O bound and OIIO releases the GIL while reading,
+        # so threads are enough. map() keeps the results in input order.
+        if workers <= 1 or len(missing) < constants.PROBE_PARALLEL_MIN_FILES:
+            probed = [_probe_file(path, stats[path]) for path in missing]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                probed = list(executor.map(
+                    _probe_file, missing, [stats[path] for path in missing]
+                ))
+
+        new_records = dict(zip(missing, probed))
+        records.update(new_records)
+        if cache:
+            cache.put_many(new_records, stats)
+
+    return [records[path] for path in paths]
+
+def _probe_file(path: str, stat: os.stat_result) -> dict:
+
+    dimensions = _get_image_dimensions(path)
+    width, height = dimensions if dimensions else (None, None)
+
+    return {
+        "width": width,
+        "height": height,
+        "file_size": stat.st_size,
+        "format": Path(path).suffix.split(".")[-1],
+    }
+
+def _make_file_dic(path: str, record: dict) -> dict:
+
+    image_size = "N/A"
+    if record["width"] and record["height"]:
+        image_size = f"{record['width']} x {record['height']}"
+
+    return {
+        "file_name": Path(path).name,
+        "format": record["format"],
+        "image_size": image_size,
+        "file_size": format_file_size(record["file_size"]),
+        "file_bytes": record["file_size"],
+        "path": str(path),
+    }
+
+def _get_image_dimensions(path: str) -> tuple[int, int] | None:
 
     if Path(path).suffix.lower() not in constants.INPUT_IMAGE_FORMAT:
         return None
 
+    if constants.FAST_HEADER_PROBE:
+        dimensions = image_header.read_dimensions(path)
+        if dimensions:
+            return dimensions
+
+    return _get_oiio_dimensions(path)
+
+def _get_oiio_dimensions(path: str) -> tuple[int, int] | None:
+
     img = oiio.ImageInput.open(str(path))
+    if not img:
+        LOGGER.warning(f"Failed to open image: {path} {oiio.geterror()}")
+        return None
     spec = img.spec()
-    img_size = f"{spec.width} x {spec.height}"
     img.close()
-    return img_size if img_size else None
+    return spec.width, spec.height
+
+def _get_image_size(path: str):
+
+    dimensions = _get_image_dimensions(path)
+    if not dimensions:
+        return None
+    return f"{dimensions[0]} x {dimensions[1]}"
 
 def _get_file_size(path: str):
 
     if Path(path).suffix.lower() not in constants.INPUT_IMAGE_FORMAT:
         return None
 
-    file_size = os.path.getsize(path)
+    return format_file_size(os.path.getsize(path))
+
+def format_file_size(file_size: int) -> str:
 
     if file_size < 1024:
         return f"{file_size} B"
@@ -190,12 +354,23 @@ def parse_path_by_type(checked_items: dict):
 
     for entry in checked_items.values():
         if entry["type"] == "seq":
-            seq_list.extend(entry["path"].values())
+            sequence = entry.get("sequence") or FrameSequence.from_paths(
+                entry["path"].values()
+            )
+            if sequence:
+                seq_list.append(sequence)
         else:
             non_seq_list.extend(entry["path"].values())
 
     return seq_list, non_seq_list
 
+def get_sequence_paths(sequences: list[FrameSequence]) -> list[str]:
+
+    paths = []
+    for sequence in sequences:
+        paths.extend(sequence.paths())
+    return paths
+
 def get_padding_path(paths: list[str], ext: str, frame_padding=None) -> str | None:
 
     if not frame_padding:
@@ -0,0 +1,237 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from qt_compat import QThread, QObject, QTimer, QImage, Qt, Signal
+import converter_constants as constants
+import thumbnail_service
+from HANLib import init_logger
+
+# Set Logger
+log_name = "flipbook"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class FrameRingBuffer():
+    """Fixed number of decoded frames between the prefetcher and the player.
+
+    Frames are keyed by a playback tick that keeps counting while looping,
+    slot = tick % capacity. The prefetcher blocks while it is a full
+    buffer ahead of the player.
+    """
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.slots = [None] * self.capacity
+        self.read_tick = 0
+        self.condition = threading.Condition()
+
+    def put(self, tick: int, image, cancel_event) -> bool:
+        with self.condition:
+            while tick >= self.read_tick + self.capacity and not cancel_event.is_set():
+                self.condition.wait(0.1)
+            if cancel_event.is_set() or tick < self.read_tick:
+                return False
+            self.slots[tick % self.capacity] = (tick, image)
+            return True
+
+    def get(self, tick: int):
+        with self.condition:
+            slot = self.slots[tick % self.capacity]
+            if slot is None or slot[0] != tick:
+                return None
+            return slot[1]
+
+    def advance(self, tick: int):
+        with self.condition:
+            self.read_tick = tick
+            self.condition.notify_all()
+
+    def reset(self, tick: int):
+        with self.condition:
+            self.slots = [None] * self.capacity
+            self.read_tick = tick
+            self.condition.notify_all()
+
+    def filled(self) -> int:
+        with self.condition:
+            return sum(
+                1 for slot in self.slots
+                if slot is not None and slot[0] >= self.read_tick
+            )
+
+
+class FramePrefetcher(QThread):
+    """Decode frames at preview size from start_tick on, in order."""
+    def __init__(self, sequence, ring: FrameRingBuffer, start_tick: int, size, parent=None):
+        super().__init__(parent)
+        self.sequence = sequence
+        self.ring = ring
+        self.start_tick = start_tick
+        self.size = size
+        self.cancel_event = threading.Event()
+
+    def run(self):
+        frame_count = len(self.sequence)
+        workers = constants.FLIPBOOK_WORKERS
+        pending = deque()
+        tick = self.start_tick
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while not self.cancel_event.is_set():
+                while len(pending) < workers * 2:
+                    path = self.sequence.path(tick % frame_count)
+                    pending.append((tick, pool.submit(self.decode, path)))
+                    tick += 1
+
+                frame_tick, future = pending.popleft()
+                if not self.ring.put(frame_tick, future.result(), self.cancel_event):
+                    break
+
+            for _, future in pending:
+                future.cancel()
+
+    def decode(self, path: str):
+        try:
+            return thumbnail_service.decode_thumbnail(path, *self.size)
+        except RuntimeError as e:
+            LOGGER.warning(str(e))
+            return QImage()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class FlipbookPlayer(QObject):
+    """Play a FrameSequence at a fixed rate from a prefetched ring buffer.
+
+    The shown frame follows the wall clock. A frame that is not decoded
+    when its time comes is counted as dropped and the last one stays up.
+    """
+    frame_changed = Signal(int, int, QImage)
+    stats_changed = Signal(dict)
+    stopped = Signal()
+
+    def __init__(self, width=300, height=200, parent=None):
+        super().__init__(parent)
+        self.size = (width, height)
+        self.sequence = None
+        self.prefetcher = None
+        # Cancelled prefetchers that are still finishing a decode.
+        self.retired = set()
+        self.ring = FrameRingBuffer(constants.FLIPBOOK_BUFFER_FRAMES)
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self.show_next_frame)
+        self.fps = 24.0
+        self.tick = 0
+        self.start_tick = 0
+        self.start_time = 0.0
+        self.play_time = 0.0
+        self.shown = 0
+        self.dropped = 0
+
+    def play(self, sequence, fps: float, index=0):
+        self.stop()
+        if sequence is None or not len(sequence):
+            return
+
+        self.sequence = sequence
+        self.fps = fps if fps > 0 else 24.0
+        self.shown = 0
+        self.dropped = 0
+        self.play_time = time.monotonic()
+        self.start_prefetch(index)
+        self.timer.start(max(1, int(1000 / self.fps / 2)))
+
+    def seek(self, index: int):
+        if self.sequence is None:
+            return
+        self.start_prefetch(index)
+
+    def start_prefetch(self, tick: int):
+        self.stop_prefetch()
+        self.tick = tick - 1
+        self.start_tick = tick
+        self.start_time = time.monotonic()
+        # A new ring per prefetcher, so a retired one still decoding can
+        # never put stale frames in front of the player.
+        self.ring = FrameRingBuffer(constants.FLIPBOOK_BUFFER_FRAMES)
+        self.ring.reset(tick)
+        self.prefetcher = FramePrefetcher(self.sequence, self.ring, tick, self.size, self)
+        self.prefetcher.start()
+
+    def stop_prefetch(self):
+        # No wait() here, a decode in flight would block the UI thread.
+        if self.prefetcher is None:
+            return
+        prefetcher = self.prefetcher
+        self.prefetcher = None
+        prefetcher.cancel()
+        self.retired.add(prefetcher)
+        prefetcher.finished.connect(lambda: self.release_prefetcher(prefetcher))
+        if prefetcher.isFinished():
+            self.release_prefetcher(prefetcher)
+
+    def release_prefetcher(self, prefetcher):
+        if prefetcher in self.retired:
+            self.retired.discard(prefetcher)
+            prefetcher.deleteLater()
+
+    def shutdown(self):
+        """Stop playback and join every prefetcher, for closing the window."""
+        self.stop()
+        for prefetcher in list(self.retired):
+            prefetcher.wait()
+
+    def stop(self):
+        was_playing = self.timer.isActive()
+        self.timer.stop()
+        self.stop_prefetch()
+        if was_playing:
+            LOGGER.info(f"Playback stopped. {self.stats()}")
+            self.stopped.emit()
+
+    def is_playing(self) -> bool:
+        return self.timer.isActive()
+
+    def show_next_frame(self):
+        # The timer runs at twice the frame rate, the clock decides which
+        # tick is due so a slow UI drops frames instead of slowing down.
+        if self.tick < self.start_tick and self.ring.get(self.start_tick) is None:
+            # Hold the clock until the first frame is decoded.
+            self.start_time = time.monotonic()
+            return
+
+        elapsed = time.monotonic() - self.start_time
+        due_tick = self.start_tick + int(elapsed * self.fps)
+        if due_tick <= self.tick:
+            return
+
+        self.dropped += due_tick - self.tick - 1
+        self.tick = due_tick
+        image = self.ring.get(due_tick)
+        self.ring.advance(due_tick)
+
+        if image is None or image.isNull():
+            self.dropped += 1
+        else:
+            self.shown += 1
+            index = due_tick % len(self.sequence)
+            self.frame_changed.emit(index, self.sequence.frames[index], image)
+
+        if due_tick % max(1, int(self.fps)) == 0:
+            self.stats_changed.emit(self.stats())
+
+    def stats(self) -> dict:
+        elapsed = max(time.monotonic() - self.play_time, 1e-6)
+        return {
+            "shown": self.shown,
+            "dropped": self.dropped,
+            "fps": self.shown / elapsed,
+            "buffered": self.ring.filled(),
+        }
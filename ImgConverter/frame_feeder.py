@@ -0,0 +1,140 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import OpenImageIO as oiio
+
+import converter_constants as constants
+import exr_layers
+from HANLib import init_logger
+
+# Set Logger
+log_name = "frame_feeder"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+FLOAT_PIX_FMT = "gbrpf32le"
+INT_PIX_FMT = "rgb48le"
+
+
+class FrameFeeder():
+    """Decode a sequence with OpenImageIO and stream it to ffmpeg as rawvideo.
+
+    Frames are decoded on a thread pool and written in order. At most
+    buffer_frames decoded frames are held at once, so memory stays bounded
+    while the encoder is slower than the readers.
+    """
+    def __init__(
+            self, sequence, pix_fmt, width, height, workers=None, buffer_frames=None,
+            layer=None
+    ):
+        self.sequence = sequence
+        self.layer = layer or exr_layers.DEFAULT_LAYER
+        self.pix_fmt = pix_fmt
+        self.width = width
+        self.height = height
+        self.workers = workers or constants.RAW_FEED_WORKERS
+        self.buffer_frames = max(1, buffer_frames or constants.RAW_FEED_BUFFER_FRAMES)
+        self.cancel_event = threading.Event()
+
+    def iter_frames(self):
+        paths = self.sequence.paths()
+        pending = deque()
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            while not self.cancel_event.is_set():
+                while len(pending) < self.buffer_frames:
+                    path = next(paths, None)
+                    if path is None:
+                        break
+                    pending.append(pool.submit(self.read_frame, path))
+
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def read_frame(self, path: str):
+        img = oiio.ImageInput.open(path)
+        if not img:
+            raise RuntimeError(f"Failed to open image: {path} {oiio.geterror()}")
+        try:
+            subimage, prefix = self.layer
+            if subimage and not img.seek_subimage(subimage, 0):
+                raise RuntimeError(f"Missing part {subimage}: {path}")
+            spec = img.spec()
+            if (spec.width, spec.height) != (self.width, self.height):
+                raise ValueError(
+                    f"Frame size {spec.width}x{spec.height} does not match "
+                    f"{self.width}x{self.height}: {path}"
+                )
+            pixel_type = oiio.FLOAT if self.pix_fmt == FLOAT_PIX_FMT else oiio.UINT16
+            # Only the span holding the layer's channels is read from disk.
+            channels = exr_layers.resolve_channels(spec.channelnames, prefix)[:3]
+            chbegin, chend = min(channels), max(channels) + 1
+            pixels = img.read_image(subimage, 0, chbegin, chend, pixel_type)
+            if pixels is None:
+                raise RuntimeError(f"Failed to read image: {path} {img.geterror()}")
+        finally:
+            img.close()
+
+        pixels = pixels.reshape(self.height, self.width, -1)
+        pixels = pixels[:, :, [channel - chbegin for channel in channels]]
+        if pixels.shape[2] < 3:
+            pixels = np.repeat(pixels[:, :, :1], 3, axis=2)
+
+        # gbrpf32le is planar in G, B, R order, rgb48le is interleaved.
+        if self.pix_fmt == FLOAT_PIX_FMT:
+            pixels = pixels[:, :, (1, 2, 0)].transpose(2, 0, 1)
+        return np.ascontiguousarray(pixels, dtype=pixels.dtype.newbyteorder("<"))
+
+    def write_to(self, stream) -> bool:
+        """Write every frame to stream, False if ffmpeg stopped reading."""
+        try:
+            for pixels in self.iter_frames():
+                try:
+                    stream.write(memoryview(pixels).cast("B"))
+                except (OSError, ValueError) as e:
+                    if not self.cancel_event.is_set():
+                        LOGGER.error(f"ffmpeg stopped reading frames: {e}")
+                    return False
+            return True
+        finally:
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+def get_raw_format(path: str, layer=None) -> tuple[str, int, int] | None:
+    """Return (pix_fmt, width, height) to feed the frame at path as rawvideo."""
+
+    img = oiio.ImageInput.open(str(path))
+    if not img:
+        LOGGER.warning(f"Failed to open image: {path} {oiio.geterror()}")
+        return None
+    subimage = (layer or exr_layers.DEFAULT_LAYER)[0]
+    if not img.seek_subimage(subimage, 0):
+        LOGGER.warning(f"Missing part {subimage}: {path}")
+        img.close()
+        return None
+    spec = img.spec()
+    img.close()
+
+    if spec.format.basetype in (oiio.HALF, oiio.FLOAT, oiio.DOUBLE):
+        pix_fmt = FLOAT_PIX_FMT
+    else:
+        pix_fmt = INT_PIX_FMT
+    return pix_fmt, spec.width, spec.height
+
+def can_feed(sequence) -> bool:
+
+    return sequence.ext.lower() in constants.RAW_FEED_FORMATS
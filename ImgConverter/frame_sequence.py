@@ -0,0 +1,229 @@
+import os
+import re
+from array import array
+from collections import Counter
+
+FRAME_PATTERN = re.compile(r"^(?P<prefix>.+)\.(?P<frame>\d+)\.(?P<ext>[^.]+)$")
+
+
+class FrameSequence():
+    """An image sequence stored as one layout plus compact per-frame arrays.
+
+    Frame paths are rebuilt from directory, prefix, padding and extension
+    instead of being stored as strings for every frame.
+    """
+    __slots__ = (
+        "directory", "prefix", "padding", "ext",
+        "frames", "file_sizes", "widths", "heights", "sampled",
+    )
+
+    def __init__(self, directory: str, prefix: str, padding: int, ext: str):
+        self.directory = directory
+        self.prefix = prefix
+        self.padding = padding
+        self.ext = ext
+        self.frames = array("q")
+        self.file_sizes = array("q")
+        self.widths = array("i")
+        self.heights = array("i")
+        # True while widths/heights come from a few probed frames only.
+        self.sampled = False
+
+    @classmethod
+    def from_paths(cls, paths):
+        sequence = None
+        for path in paths:
+            directory, file_name = os.path.split(path)
+            match = FRAME_PATTERN.match(file_name)
+            if not match:
+                continue
+
+            if sequence is None:
+                sequence = cls(
+                    directory, match.group("prefix"),
+                    len(match.group("frame")), match.group("ext")
+                )
+            sequence.add_frame(int(match.group("frame")))
+
+        if sequence is not None:
+            sequence.sort()
+        return sequence
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __repr__(self):
+        return f"FrameSequence({self.padding_path()!r}, {len(self)} frames)"
+
+    @property
+    def name(self) -> str:
+        return self.prefix
+
+    @property
+    def format(self) -> str:
+        return self.ext
+
+    @property
+    def start(self) -> int | None:
+        return self.frames[0] if self.frames else None
+
+    @property
+    def end(self) -> int | None:
+        return self.frames[-1] if self.frames else None
+
+    def add_frame(self, frame: int, file_size=0, width=0, height=0):
+        self.frames.append(frame)
+        self.file_sizes.append(file_size)
+        self.widths.append(width or 0)
+        self.heights.append(height or 0)
+
+    def sort(self):
+        frames = self.frames
+        if all(frames[i] < frames[i + 1] for i in range(len(frames) - 1)):
+            return
+        order = sorted(range(len(frames)), key=frames.__getitem__)
+        for name in ("frames", "file_sizes", "widths", "heights"):
+            values = getattr(self, name)
+            setattr(self, name, array(values.typecode, (values[i] for i in order)))
+
+    def subset(self, indices):
+        """Return a new sequence holding only the frames at the given indices."""
+        sequence = FrameSequence(self.directory, self.prefix, self.padding, self.ext)
+        for i in indices:
+            sequence.add_frame(
+                self.frames[i], self.file_sizes[i], self.widths[i], self.heights[i]
+            )
+        return sequence
+
+    def file_name(self, index: int) -> str:
+        return f"{self.prefix}.{self.frames[index]:0{self.padding}d}.{self.ext}"
+
+    def path(self, index: int) -> str:
+        return os.path.join(self.directory, self.file_name(index))
+
+    def paths(self):
+        for i in range(len(self.frames)):
+            yield self.path(i)
+
+    def image_size(self, index=0) -> str:
+        if not self.frames or not self.widths[index] or not self.heights[index]:
+            return "N/A"
+        return f"{self.widths[index]} x {self.heights[index]}"
+
+    def fill_dimensions(self, width: int, height: int):
+        self.widths = array("i", [width]) * len(self.frames)
+        self.heights = array("i", [height]) * len(self.frames)
+
+    def outliers(self) -> list[int]:
+        """Indices of frames whose resolution differs from the most common one."""
+        sizes = Counter(zip(self.widths, self.heights))
+        if len(sizes) < 2:
+            return []
+        common = sizes.most_common(1)[0][0]
+        return [
+            i for i, size in enumerate(zip(self.widths, self.heights))
+            if size != common
+        ]
+
+    def total_size(self) -> int:
+        return sum(self.file_sizes)
+
+    def padding_path(self, ext=None) -> str:
+        file_name = f"{self.prefix}.%0{self.padding}d.{ext or self.ext}"
+        return os.path.join(self.directory, file_name)
+
+    def is_contiguous(self) -> bool:
+        return len(self.ranges()) == 1
+
+    def ranges(self) -> list[tuple[int, int]]:
+        return frame_ranges(self.frames)
+
+    def gaps(self) -> list[tuple[int, int]]:
+        return missing_ranges(self.frames)
+
+    def range_string(self) -> str:
+        return format_ranges(self.ranges())
+
+
+def group_sequences(paths):
+    """Group image paths into sequences in a single pass.
+
+    Frames are grouped by (directory, prefix, padding, extension), so two
+    sequences in one folder or two same-named folders stay separate.
+    Returns ({padding path: FrameSequence}, paths that are not frames).
+    """
+    groups = {}
+    none_seq = []
+    for path in paths:
+        directory, file_name = os.path.split(path)
+        match = FRAME_PATTERN.match(file_name)
+        if not match:
+            none_seq.append(path)
+            continue
+
+        prefix, digits, ext = match.group("prefix", "frame", "ext")
+        key = (directory, prefix, ext)
+        if key not in groups:
+            groups[key] = []
+        groups[key].append(digits)
+
+    sequences = {}
+    for (directory, prefix, ext), frames in groups.items():
+        for padding, numbers in _split_by_padding(frames).items():
+            sequence = FrameSequence(directory, prefix, padding, ext)
+            sequence.frames = array("q", numbers)
+            sequence.file_sizes = array("q", bytes(8 * len(numbers)))
+            sequence.widths = array("i", bytes(4 * len(numbers)))
+            sequence.heights = array("i", bytes(4 * len(numbers)))
+            sequence.sort()
+            sequences[sequence.padding_path()] = sequence
+
+    return sequences, none_seq
+
+def _split_by_padding(frames: list[str]) -> dict:
+
+    # Zero-padded tokens fix the padding exactly. Tokens without a leading
+    # zero (e.g. 1001 or 10000 in a %04d sequence) join the widest padding
+    # they fit into, otherwise they form an unpadded sequence.
+    padded = sorted({len(f) for f in frames if len(f) > 1 and f[0] == "0"})
+
+    if not padded:
+        lengths = {len(f) for f in frames}
+        padding = lengths.pop() if len(lengths) == 1 else 1
+        return {padding: [int(f) for f in frames]}
+
+    by_padding = {}
+    for f in frames:
+        if len(f) > 1 and f[0] == "0":
+            padding = len(f)
+        else:
+            fits = [p for p in padded if p <= len(f)]
+            padding = fits[-1] if fits else 1
+        if padding not in by_padding:
+            by_padding[padding] = []
+        by_padding[padding].append(int(f))
+
+    return by_padding
+
+def frame_ranges(frames) -> list[tuple[int, int]]:
+
+    ranges = []
+    for frame in sorted(set(frames)):
+        if ranges and frame == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], frame)
+        else:
+            ranges.append((frame, frame))
+    return ranges
+
+def missing_ranges(frames) -> list[tuple[int, int]]:
+
+    ranges = frame_ranges(frames)
+    return [
+        (ranges[i][1] + 1, ranges[i + 1][0] - 1) for i in range(len(ranges) - 1)
+    ]
+
+def format_ranges(ranges: list[tuple[int, int]]) -> str:
+
+    return ", ".join(
+        str(start) if start == end else f"{start}-{end}" for start, end in ranges
+    )
@@ -0,0 +1,113 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+import OpenImageIO as oiio
+
+import converter_constants as constants
+import exr_layers
+from HANLib import init_logger
+
+# Set Logger
+log_name = "image_engine"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# Pixel type and compression written per output format.
+OUTPUT_SETTINGS = {
+    "jpg": {"type": "uint8", "compression": "jpeg:95", "channels": 3},
+    "png": {"type": "uint8", "compression": "", "channels": 4},
+    "exr": {"type": "half", "compression": "zip", "channels": 4},
+}
+
+
+def get_output_paths(paths: list[str], save_path: str) -> list[tuple[str, str]]:
+    """Pair every input with its output path, numbered from 1 like ffmpeg.
+
+    Raises ValueError when several frames would go to one file.
+    """
+    if "%" not in save_path:
+        if len(paths) > 1:
+            raise ValueError(
+                f"{len(paths)} frames can't be written to a single file: {save_path}"
+            )
+        return [(path, save_path) for path in paths]
+    return [(path, save_path % (i + 1)) for i, path in enumerate(paths)]
+
+def convert_frame(src: str, dst: str, size=None, layer=None):
+
+    subimage, prefix = layer or exr_layers.DEFAULT_LAYER
+    output_format = Path(dst).suffix.lstrip(".").lower()
+    settings = OUTPUT_SETTINGS.get(output_format, OUTPUT_SETTINGS["png"])
+
+    # The header alone tells which channels the layer uses, then only that
+    # channel span is read instead of every AOV in the file.
+    buf = oiio.ImageBuf(src, subimage, 0)
+    channel_names = buf.spec().channelnames
+    if buf.has_error:
+        raise RuntimeError(f"Failed to read image: {src} {buf.geterror()}")
+
+    channels = exr_layers.resolve_channels(channel_names, prefix)[:settings["channels"]]
+    chbegin, chend = min(channels), max(channels) + 1
+    if not buf.read(subimage=subimage, miplevel=0, chbegin=chbegin, chend=chend, force=True):
+        raise RuntimeError(f"Failed to read image: {src} {buf.geterror()}")
+
+    if prefix or channels != list(range(chbegin, chend)):
+        buf = oiio.ImageBufAlgo.channels(
+            buf, tuple(channel - chbegin for channel in channels),
+            newchannelnames=exr_layers.COLOR_CHANNELS[:len(channels)]
+        )
+
+    if size:
+        # Same as get_resize_cmd: scale to fit inside the box, pad with black.
+        width, height = size
+        roi = oiio.ROI(0, width, 0, height, 0, 1, 0, buf.nchannels)
+        buf = oiio.ImageBufAlgo.fit(buf, fillmode="letterbox", roi=roi)
+
+    if settings["compression"]:
+        buf.specmod().attribute("compression", settings["compression"])
+
+    # Write next to the target and rename, so a cancelled or failed job never
+    # leaves a truncated frame behind.
+    partial_path = str(Path(dst).with_name(f".{Path(dst).stem}.partial{Path(dst).suffix}"))
+    if not buf.write(partial_path, settings["type"]):
+        error = buf.geterror()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise RuntimeError(f"Failed to write image: {dst} {error}")
+    os.replace(partial_path, dst)
+
+def iter_convert(
+        frames: list[tuple[str, str]], size=None, workers=None, cancel_event=None,
+        layer=None
+):
+    """Convert (src, dst) pairs on a thread pool, yield (dst, error) as they finish."""
+
+    workers = workers or constants.NATIVE_IMAGE_WORKERS
+    cancel_event = cancel_event or threading.Event()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_convert_task, src, dst, size, layer, cancel_event)
+            for src, dst in frames
+        ]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+
+def _convert_task(src, dst, size, layer, cancel_event):
+
+    if cancel_event.is_set():
+        return dst, None
+    try:
+        convert_frame(src, dst, size, layer)
+    except (RuntimeError, OSError) as e:
+        LOGGER.error(str(e))
+        return dst, str(e)
+    return dst, None
@@ -0,0 +1,168 @@
+import os
+import struct
+from pathlib import Path
+
+from HANLib import init_logger
+
+# Set Logger
+log_name = "image_header"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# Bytes read up front, enough for every fixed-layout header below.
+HEAD_SIZE = 64
+# EXR headers are walked attribute by attribute up to this size.
+EXR_MAX_HEADER = 1 << 20
+
+EXR_MAGIC = 20000630
+# JPEG start-of-frame markers, DHT/JPG/DAC share the range but are not SOF.
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_dimensions(path: str) -> tuple[int, int] | None:
+    """Return (width, height) from the file header, None if it can't tell.
+
+    Callers fall back to OpenImageIO for None, e.g. BigTIFF or a header
+    this parser does not know.
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(HEAD_SIZE)
+            for parser in (_png, _jpeg, _exr, _tiff, _gif, _bmp, _webp):
+                dimensions = parser(f, head)
+                if dimensions:
+                    return dimensions
+    except (OSError, struct.error, ValueError) as e:
+        LOGGER.warning(f"Failed to parse header: {path} {e}")
+    return None
+
+def _png(f, head):
+
+    if head[:8] != b"\x89PNG\r\n\x1a\n" or head[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", head[16:24])
+
+def _gif(f, head):
+
+    if head[:6] not in (b"GIF87a", b"GIF89a"):
+        return None
+    return struct.unpack("<HH", head[6:10])
+
+def _bmp(f, head):
+
+    if head[:2] != b"BM":
+        return None
+    header_size = struct.unpack("<I", head[14:18])[0]
+    if header_size == 12:
+        return struct.unpack("<HH", head[18:22])
+    width, height = struct.unpack("<ii", head[18:26])
+    return width, abs(height)
+
+def _webp(f, head):
+
+    if head[:4] != b"RIFF" or head[8:12] != b"WEBP":
+        return None
+
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        bits = struct.unpack("<I", head[21:25])[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(head[24:27], "little") + 1
+        height = int.from_bytes(head[27:30], "little") + 1
+        return width, height
+    return None
+
+def _jpeg(f, head):
+
+    if head[:2] != b"\xff\xd8":
+        return None
+
+    # Walk the marker segments, EXIF and ICC blocks are skipped with seek.
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            return None
+
+        marker = byte[0]
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            continue
+        if marker in (0xD9, 0xDA):
+            return None
+
+        length = struct.unpack(">H", f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+def _tiff(f, head):
+
+    if head[:4] == b"II*\x00":
+        order = "<"
+    elif head[:4] == b"MM\x00*":
+        order = ">"
+    else:
+        return None
+
+    f.seek(struct.unpack(order + "I", head[4:8])[0])
+    count = struct.unpack(order + "H", f.read(2))[0]
+    entries = f.read(count * 12)
+
+    values = {}
+    for i in range(count):
+        tag, field_type, _, value = struct.unpack(
+            order + "HHI4s", entries[i * 12:(i + 1) * 12]
+        )
+        if tag not in (256, 257):
+            continue
+        if field_type == 3:
+            values[tag] = struct.unpack(order + "H", value[:2])[0]
+        elif field_type == 4:
+            values[tag] = struct.unpack(order + "I", value)[0]
+
+    if 256 in values and 257 in values:
+        return values[256], values[257]
+    return None
+
+def _exr(f, head):
+
+    if len(head) < 8 or struct.unpack("<i", head[:4])[0] != EXR_MAGIC:
+        return None
+
+    # The first part header follows the version field in single and
+    # multi-part files: name\0 type\0 int32 size, value; an empty name ends it.
+    f.seek(8)
+    read = 8
+    while read < EXR_MAX_HEADER:
+        name = _read_cstring(f)
+        if not name:
+            return None
+        attr_type = _read_cstring(f)
+        size = struct.unpack("<i", f.read(4))[0]
+        read += len(name) + len(attr_type) + 6 + size
+
+        if name == b"dataWindow" and attr_type == b"box2i":
+            xmin, ymin, xmax, ymax = struct.unpack("<iiii", f.read(16))
+            return xmax - xmin + 1, ymax - ymin + 1
+        f.seek(size, os.SEEK_CUR)
+    return None
+
+def _read_cstring(f, limit=256) -> bytes:
+
+    chars = bytearray()
+    while len(chars) < limit:
+        char = f.read(1)
+        if not char or char == b"\x00":
+            break
+        chars += char
+    return bytes(chars)
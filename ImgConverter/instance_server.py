@@ -0,0 +1,101 @@
+import os
+import json
+from pathlib import Path
+
+from qt_compat import QObject, QLocalServer, QLocalSocket, Signal
+import single_instance
+from HANLib import init_logger
+
+# Set Logger
+log_name = "instance_server"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class InstanceServer(QObject):
+    """Receive paths from later launches, see single_instance.send_paths."""
+    paths_received = Signal(list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self.accept)
+        self.buffers = {}
+        # connection -> paths read and acknowledged, waiting for COMMIT.
+        self.pending = {}
+
+    def listen(self) -> bool:
+        name = single_instance.get_server_name()
+        if self.server.listen(name):
+            return True
+
+        # Only a name nobody answers on is left over from a crash, never
+        # take it from a window that started after send_paths gave up.
+        if self.is_answered(name):
+            LOGGER.warning(f"Another window already listens on {name}.")
+            return False
+        QLocalServer.removeServer(name)
+        if self.server.listen(name):
+            return True
+
+        LOGGER.warning(f"Single instance server not started: {self.server.errorString()}")
+        return False
+
+    def is_answered(self, name: str) -> bool:
+
+        socket = QLocalSocket()
+        socket.connectToServer(name)
+        answered = socket.waitForConnected(
+            int(single_instance.CONNECT_TIMEOUT * 1000)
+        )
+        socket.abort()
+        return answered
+
+    def accept(self):
+        while self.server.hasPendingConnections():
+            connection = self.server.nextPendingConnection()
+            self.buffers[connection] = b""
+            connection.readyRead.connect(lambda c=connection: self.read(c))
+            connection.disconnected.connect(lambda c=connection: self.drop(c))
+
+    def read(self, connection):
+        buffer = self.buffers.get(connection, b"") + bytes(connection.readAll())
+        lines = buffer.split(b"\n")
+        self.buffers[connection] = lines.pop()
+        for line in lines:
+            self.handle(connection, line + b"\n")
+
+    def handle(self, connection, line: bytes):
+        # The paths arrive first and are acknowledged, they are loaded once
+        # the launch confirms it did not give up and open its own window.
+        if connection in self.pending:
+            paths = self.pending.pop(connection)
+            connection.disconnectFromServer()
+            if line != single_instance.COMMIT:
+                LOGGER.warning(f"Second launch did not confirm: {line!r}")
+                return
+            LOGGER.info(f"Received {len(paths)} path(s) from a second launch.")
+            self.paths_received.emit(paths)
+            return
+
+        try:
+            paths = [str(path) for path in json.loads(line)["paths"]]
+        except (ValueError, KeyError, TypeError) as e:
+            LOGGER.warning(f"Invalid message from a second launch: {e}")
+            connection.disconnectFromServer()
+            return
+
+        if connection.write(single_instance.ACK) != len(single_instance.ACK):
+            connection.disconnectFromServer()
+            return
+        connection.flush()
+        self.pending[connection] = paths
+
+    def drop(self, connection):
+        self.buffers.pop(connection, None)
+        self.pending.pop(connection, None)
+        connection.deleteLater()
+
+    def close(self):
+        self.server.close()
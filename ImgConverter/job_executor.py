@@ -0,0 +1,221 @@
+import io
+import os
+import time
+import threading
+import subprocess
+from collections import deque
+from pathlib import Path
+
+import converter_constants as constants
+import ffmpeg_handler as ffmpeg
+import image_engine
+from HANLib import init_logger
+
+# Set Logger
+log_name = "job_executor"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# Lines of ffmpeg stderr kept for the error message of a failed job.
+STDERR_TAIL = 20
+# Seconds between progress updates sent to on_progress.
+PROGRESS_INTERVAL = 0.25
+
+
+class JobExecutor():
+    """Run one build_conversion job in the calling thread.
+
+    Progress goes to on_progress as get_progress_status dicts. Nothing here
+    touches Qt, the UI wraps it in a QThread and the batch mode calls it
+    directly.
+    """
+    def __init__(self, job: dict, on_progress=None):
+        self.job = job
+        self.on_progress = on_progress
+        self.processes = []
+        self.cancelled = False
+        # Held while a process is launched, so cancel never misses one.
+        self.lock = threading.Lock()
+        self.cancel_event = threading.Event()
+        self.error = ""
+        self.stderr_tail = deque(maxlen=STDERR_TAIL)
+        self.start_time = time.monotonic()
+
+    def run(self) -> tuple[bool, str]:
+        """Return (success, message), message is the error of a failed job."""
+        self.start_time = time.monotonic()
+        segment_cmds = self.job.get("segment_cmds") or []
+
+        if self.job.get("frames"):
+            returncode = self.run_native(self.job["frames"])
+        elif self.job.get("feed"):
+            returncode = self.run_processes([self.job["cmd"]], feed=self.job["feed"])
+        elif segment_cmds:
+            returncode = self.run_processes(segment_cmds)
+            if returncode == 0 and not self.cancelled:
+                returncode = self.run_processes([self.job["cmd"]], report=False)
+        else:
+            returncode = self.run_processes([self.job["cmd"]])
+
+        ffmpeg.cleanup_job(self.job)
+
+        if self.cancelled:
+            self.remove_partial_output()
+            LOGGER.info(f"Conversion cancelled. {self.job['cmd']}")
+            return False, "Conversion cancelled."
+        if returncode == 0:
+            LOGGER.info("Conversion completed successfully.")
+            return True, ""
+
+        error = self.error or "".join(self.stderr_tail)
+        LOGGER.error(f"Conversion failed. {error}")
+        return False, error
+
+    def run_processes(self, cmds: list[str], report=True, feed=None) -> int:
+        statuses = [{} for _ in cmds]
+        readers = []
+        self.processes = []
+
+        for i, cmd in enumerate(cmds):
+            cmd = ffmpeg.add_progress_args(cmd)
+            LOGGER.info(f"Executing command: {cmd}")
+            with self.lock:
+                if self.cancelled:
+                    self.kill_processes()
+                    return -1
+                try:
+                    # Binary pipes, the feed writes raw pixels to stdin and
+                    # the readers decode stdout and stderr themselves.
+                    process = subprocess.Popen(
+                        ffmpeg.split_cmd(cmd), stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        stdin=subprocess.PIPE if feed else subprocess.DEVNULL
+                    )
+                except OSError as e:
+                    self.error = f"{e}\n\nCommand: {cmd}"
+                    self.kill_processes()
+                    return -1
+                self.processes.append(process)
+
+            for target, args in (
+                (self.read_progress, (process, statuses[i])),
+                (self.read_stderr, (process,)),
+            ):
+                reader = threading.Thread(target=target, args=args, daemon=True)
+                reader.start()
+                readers.append(reader)
+
+            if feed:
+                writer = threading.Thread(
+                    target=self.write_frames, args=(process, feed), daemon=True
+                )
+                writer.start()
+                readers.append(writer)
+
+        while any(process.poll() is None for process in self.processes):
+            time.sleep(PROGRESS_INTERVAL)
+            if report:
+                self.emit_progress(statuses)
+
+        for reader in readers:
+            reader.join()
+        if report:
+            self.emit_progress(statuses)
+
+        for process in self.processes:
+            if process.returncode != 0:
+                self.stderr_tail.append(f"\nCommand: {ffmpeg.join_cmd(process.args)}")
+                return process.returncode
+        return 0
+
+    def run_native(self, frames: list[tuple[str, str]]) -> int:
+        workers = self.job.get("workers")
+        LOGGER.info(f"Converting {len(frames)} frame(s) with OpenImageIO.")
+
+        done = 0
+        last_emit = 0.0
+        for _, error in image_engine.iter_convert(
+            frames, self.job.get("size"), workers, self.cancel_event,
+            self.job.get("layer")
+        ):
+            if self.cancelled:
+                return -1
+            if error:
+                self.error = error
+                return -1
+
+            done += 1
+            now = time.monotonic()
+            if now - last_emit >= PROGRESS_INTERVAL or done == len(frames):
+                last_emit = now
+                self.emit_progress([{
+                    "frame": done,
+                    "fps": done / max(now - self.start_time, 1e-6),
+                    "speed": f"{workers or constants.NATIVE_IMAGE_WORKERS} threads",
+                }])
+        return 0
+
+    def read_progress(self, process, status: dict):
+        values = {}
+        for line in _text_lines(process.stdout):
+            block = ffmpeg.parse_progress_line(line, values)
+            if block is not None:
+                status.update(block)
+
+    def write_frames(self, process, feed):
+        try:
+            feed.write_to(process.stdin)
+        except (RuntimeError, ValueError, TypeError, OSError) as e:
+            # ffmpeg would encode a short clip, stop it and report the frame.
+            self.error = str(e)
+            LOGGER.error(f"Frame decode failed. {e}")
+            process.kill()
+
+    def read_stderr(self, process):
+        for line in _text_lines(process.stderr):
+            self.stderr_tail.append(line)
+
+    def emit_progress(self, statuses: list[dict]):
+        if self.on_progress is None:
+            return
+        # Parallel segments report separately, add them up into one status.
+        values = {
+            "frame": sum(ffmpeg.to_number(status.get("frame"), int) or 0 for status in statuses),
+            "fps": sum(ffmpeg.to_number(status.get("fps"), float) or 0 for status in statuses),
+            "speed": statuses[0].get("speed", "N/A"),
+            "out_time": statuses[0].get("out_time", ""),
+        }
+        if len(statuses) > 1:
+            values["speed"] = f"{len(statuses)} segments"
+        elapsed = time.monotonic() - self.start_time
+        total_frames = self.job.get("total_frames", 0)
+        self.on_progress(ffmpeg.get_progress_status(values, total_frames, elapsed))
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            self.cancel_event.set()
+            if self.job.get("feed"):
+                self.job["feed"].cancel()
+            self.kill_processes()
+
+    def kill_processes(self):
+        for process in self.processes:
+            if process.poll() is None:
+                process.kill()
+
+    def remove_partial_output(self):
+        save_path = self.job.get("save_path", "")
+        # Image sequence outputs are patterns, only single files are removed.
+        if "%" in save_path or not os.path.isfile(save_path):
+            return
+        try:
+            os.remove(save_path)
+        except OSError as e:
+            LOGGER.warning(f"Failed to remove partial output: {save_path} {e}")
+
+
+def _text_lines(stream):
+
+    return io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
@@ -0,0 +1,133 @@
+import os
+import sys
+from collections import deque
+from pathlib import Path
+
+sys.path.append(os.path.dirname(__file__))
+
+from qt_compat import QThread, QObject, Signal
+from job_executor import JobExecutor
+import ffmpeg_handler as ffmpeg
+from HANLib import init_logger
+
+# Set Logger
+log_name = "job_runner"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class ConversionJob(QThread):
+    """Run one ffmpeg job off the UI thread and report its progress.
+
+    job is the dict returned by ffmpeg_handler.build_conversion, the work
+    itself is done by job_executor.JobExecutor.
+    """
+    progress = Signal(dict)
+    job_finished = Signal(bool, str)
+
+    def __init__(self, job: dict, parent=None, index=0):
+        super().__init__(parent)
+        self.job = job
+        self.index = index
+        self.executor = JobExecutor(job, self.progress.emit)
+
+    def run(self):
+        success, message = self.executor.run()
+        self.job_finished.emit(success, message)
+
+    def cancel(self):
+        self.executor.cancel()
+
+
+class JobQueue(QObject):
+    """Run a list of build_conversion jobs, at most max_concurrent at once."""
+    job_started = Signal(int)
+    job_progress = Signal(int, dict)
+    job_finished = Signal(int, bool, str)
+    queue_finished = Signal()
+
+    def __init__(self, jobs: list[dict], max_concurrent=1, parent=None):
+        super().__init__(parent)
+        self.jobs = jobs
+        self.max_concurrent = max(1, max_concurrent)
+        self.pending = deque(range(len(jobs)))
+        self.running = {}
+        self.results = {}
+        self.percents = [0] * len(jobs)
+        self.cancelled = False
+
+    def start(self):
+        LOGGER.info(
+            f"Starting {len(self.jobs)} job(s), {self.max_concurrent} at a time."
+        )
+        self.start_next()
+
+    def start_next(self):
+        while (
+            self.pending and len(self.running) < self.max_concurrent
+            and not self.cancelled
+        ):
+            index = self.pending.popleft()
+            worker = ConversionJob(self.jobs[index], self, index)
+            worker.progress.connect(self.on_job_progress)
+            worker.job_finished.connect(self.on_job_finished)
+            self.running[index] = worker
+            worker.start()
+            self.job_started.emit(index)
+
+    def on_job_progress(self, status: dict):
+        index = self.sender().index
+        self.percents[index] = status["percent"]
+        self.job_progress.emit(index, status)
+
+    def on_job_finished(self, success: bool, message: str):
+        worker = self.sender()
+        index = worker.index
+        worker.wait()
+        self.running.pop(index, None)
+        worker.deleteLater()
+
+        self.percents[index] = 100
+        self.results[index] = (success, message)
+        self.job_finished.emit(index, success, message)
+
+        self.start_next()
+        if not self.running and (not self.pending or self.cancelled):
+            self.queue_finished.emit()
+
+    def cancel(self):
+        self.cancelled = True
+        # Jobs that never started still own their file lists.
+        for index in self.pending:
+            ffmpeg.cleanup_job(self.jobs[index])
+        self.pending.clear()
+        for worker in self.running.values():
+            worker.cancel()
+
+    def is_running(self) -> bool:
+        return bool(self.running)
+
+    def wait(self):
+        for worker in list(self.running.values()):
+            worker.wait()
+
+    def total_percent(self) -> int:
+        if not self.jobs:
+            return 100
+        return int(sum(self.percents) / len(self.jobs))
+
+    def failed_jobs(self) -> list[int]:
+        return [index for index, (success, _) in self.results.items() if not success]
+
+
+def format_eta(seconds) -> str:
+
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
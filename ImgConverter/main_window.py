@@ -7,9 +7,13 @@ from qt_compat import (
     Qt, QIcon, QFontDatabase, QFont, QWidget, QLabel, QPushButton, 
     QSizePolicy, QComboBox, QSpacerItem, QFrame, QHBoxLayout, QVBoxLayout,
     QGridLayout, QGroupBox, QApplication, QLineEdit, qdarktheme, QPixmap, 
+    QProgressBar, QCheckBox, QSlider,
 )
 from Widgets import push_button, tree_widget
 import converter_constants as constants
+import exr_layers
+import thumbnail_service
+import flipbook
 from HANLib import init_logger
 
 # Set Logger
@@ -25,6 +29,13 @@ class ConverterUi(QWidget):
         super().__init__()
 
         self.clicked_file_path = ""
+        self.preview_path = ""
+        # Top level node and path the layer combobox belongs to.
+        self.layer_node = None
+        self.layer_path = ""
+        self.thumbnails = thumbnail_service.ThumbnailService(300, 200, self)
+        self.flipbook = flipbook.FlipbookPlayer(300, 200, self)
+        self.preview_sequence = None
             
         self.__set_window()
         self.__set_font()
@@ -96,6 +107,14 @@ class ConverterUi(QWidget):
         self.preview_img.setAlignment(Qt.AlignCenter)
         # self.preview_img.setMinimumSize(300, 200)
 
+        # Flipbook playback of the selected sequence
+        self.play_btn = QPushButton("Play")
+        self.play_btn.setFixedWidth(60)
+        self.play_btn.setFont(QFont("Lato", 10))
+        self.frame_slider = QSlider(Qt.Horizontal)
+        self.playback_lb = self.create_label()
+        self.set_playback_enabled(False)
+
         # Create file info labels
         self.file_name_lb = self.create_label()
         self.file_format_lb = self.create_label()
@@ -133,11 +152,33 @@ class ConverterUi(QWidget):
         self.height_lb = self.create_label("Height:")
         self.height_le = QLineEdit()
 
+        # exr part and channel layer to convert
+        self.layer_lb = self.create_label("Layer:")
+        self.layer_cb = QComboBox()
+        self.layer_cb.addItem("RGBA", None)
+        self.layer_cb.setEnabled(False)
+
         # format
         self.output_format_lb = self.create_label("Output format:")
         self.output_format_cb = QComboBox()
         self.output_format_cb.addItems(constants.OUTPUT_FORMAT)
 
+        # one job per top level item
+        self.separate_jobs_chb = QCheckBox("Convert each item separately")
+        self.separate_jobs_chb.setFont(QFont("Lato", 10))
+
+        # split one long sequence into parallel encodes
+        self.segment_encode_chb = QCheckBox("Encode long sequences in parallel segments")
+        self.segment_encode_chb.setFont(QFont("Lato", 10))
+
+        # decode exr frames with OpenImageIO instead of ffmpeg
+        self.raw_feed_chb = QCheckBox("Decode EXR frames with OpenImageIO")
+        self.raw_feed_chb.setFont(QFont("Lato", 10))
+
+        # convert image outputs in process instead of with ffmpeg
+        self.native_image_chb = QCheckBox("Convert images with OpenImageIO")
+        self.native_image_chb.setFont(QFont("Lato", 10))
+
         # save path
         self.save_path_lb = self.create_label("Save to:")
         self.save_path_le = QLineEdit()
@@ -150,6 +191,26 @@ class ConverterUi(QWidget):
         self.convert_btn.setFixedHeight(30)
         self.convert_btn.setFont(QFont("Lato", 11))
 
+        # Folder scan progress
+        self.scan_progress_bar = QProgressBar()
+        self.scan_progress_bar.setRange(0, 0)
+        self.scan_progress_bar.setFixedHeight(20)
+        self.scan_lb = self.create_label()
+        self.scan_cancel_btn = QPushButton("Cancel")
+        self.scan_cancel_btn.setFixedWidth(80)
+        self.set_scan_visible(False)
+
+        # Conversion progress
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.progress_bar.setFixedHeight(20)
+        self.progress_lb = self.create_label()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setFixedHeight(30)
+        self.cancel_btn.setFixedWidth(100)
+        self.cancel_btn.setFont(QFont("Lato", 10))
+        self.set_progress_visible(False)
+
     def __change_event(self):
         self.output_format_cb.currentTextChanged.connect(self.set_conversion_settings)
         self.codec_cb.currentTextChanged.connect(self.set_output_format)
@@ -161,11 +222,14 @@ class ConverterUi(QWidget):
         before_path = self.save_path_le.text() or ""
         self.save_path_le.clear()
         format = self.output_format_cb.currentText()
-        widgets = [self.frame_rate_cb, self.codec_cb]
+        widgets = [
+            self.frame_rate_cb, self.codec_cb, self.segment_encode_chb, self.raw_feed_chb
+        ]
 
         if format in constants.OUTPUT_VIDEO_FORMAT:
             for widget in widgets:
                 widget.setDisabled(False)
+            self.native_image_chb.setDisabled(True)
 
             codec = constants.EXT_WITH_CODEC.get(format, "")
             self.codec_cb.setCurrentText(codec)
@@ -173,6 +237,7 @@ class ConverterUi(QWidget):
         elif format in constants.OUTPUT_IMAGE_FORMAT:
             for widget in widgets:
                 widget.setDisabled(True)
+            self.native_image_chb.setDisabled(False)
         
         self.set_save_path(before_path, format)
 
@@ -244,26 +309,39 @@ class ConverterUi(QWidget):
             self.height_le.setText(image_size.split('x')[1])
 
     def __connect_signals(self):
-        self.file_tree.itemClicked.connect(self.update_preview)
-
-    def update_preview(self, item):
+        self.file_tree.clicked.connect(self.update_preview)
+        self.thumbnails.thumbnail_ready.connect(self.set_preview_image)
+        self.thumbnails.layers_ready.connect(self.show_layers)
+        self.layer_cb.activated.connect(self.store_layer)
+        self.file_tree.scan_started.connect(lambda: self.set_scan_visible(True))
+        self.file_tree.scan_progress.connect(self.update_scan_progress)
+        self.file_tree.scan_finished.connect(lambda _: self.set_scan_visible(False))
+        self.scan_cancel_btn.clicked.connect(self.file_tree.cancel_scan)
+        self.play_btn.clicked.connect(self.toggle_playback)
+        self.frame_slider.valueChanged.connect(self.scrub_preview)
+        self.flipbook.frame_changed.connect(self.show_flipbook_frame)
+        self.flipbook.stats_changed.connect(self.show_playback_stats)
+        self.flipbook.stopped.connect(lambda: self.play_btn.setText("Play"))
+
+    def update_preview(self, index):
         self.file_name_lb.clear()
         self.file_format_lb.clear()
         self.img_size_lb.clear()
         self.file_size_lb.clear()
 
-        selected_items = self.file_tree.selectedItems()
+        selected_items = self.file_tree.selected_nodes()
 
         if not selected_items:
             return
 
+        item = self.file_tree.tree_model.node_from_index(index)
         for selected_item in selected_items:
-            if selected_item.parent(): # child
+            if selected_item.parent: # child
                 item = selected_item
                 file_name = item.text(self.file_tree.file_name_col)
             else: # parent
                 parent = selected_item
-                if parent.childCount() > 0:
+                if parent.child_count() > 0:
                     file_name = parent.text(self.file_tree.file_name_col)
                 else:
                     item = selected_item
@@ -273,19 +351,166 @@ class ConverterUi(QWidget):
         img_size = item.text(self.file_tree.image_size_col)
         file_size = item.text(self.file_tree.file_size_col)
         self.clicked_file_path = item.text(self.file_tree.path_col)
+        self.flipbook.stop()
+        if item.is_sequence:
+            self.preview_path = item.sequence.path(0)
+            self.set_preview_sequence(item.sequence)
+        else:
+            self.preview_path = self.clicked_file_path
+            self.set_preview_sequence(None)
+        self.layer_node = item.parent or item
+        self.set_layers(self.preview_path)
 
         self.file_name_lb.setText(str(file_name))
         self.file_format_lb.setText(str(format).upper())
         self.img_size_lb.setText(str(img_size))
         self.file_size_lb.setText(str(file_size))
 
-        pixmap = QPixmap(self.clicked_file_path)
-        if pixmap.isNull():
+        image = self.thumbnails.request(self.preview_path)
+        if image is None:
+            self.preview_img.setText("Loading preview...")
+            return
+        self.set_preview_image(self.preview_path, image)
+
+    def set_preview_image(self, path: str, image):
+        if path != self.preview_path:
+            return
+
+        if image.isNull():
             self.preview_img.setText("No preview available")
             return
-        self.preview_img.setPixmap(pixmap.scaled(
-            300, 200, Qt.KeepAspectRatio, Qt.SmoothTransformation
-        ))
+        self.preview_img.setPixmap(QPixmap.fromImage(image))
+
+    def set_preview_sequence(self, sequence):
+        self.preview_sequence = sequence
+        self.playback_lb.clear()
+        self.set_playback_enabled(sequence is not None)
+        if sequence is None:
+            return
+
+        self.frame_slider.blockSignals(True)
+        self.frame_slider.setRange(0, len(sequence) - 1)
+        self.frame_slider.setValue(0)
+        self.frame_slider.blockSignals(False)
+        self.playback_lb.setText(f"Frame {sequence.start}")
+
+    def set_playback_enabled(self, enabled: bool):
+        self.play_btn.setEnabled(enabled)
+        self.frame_slider.setEnabled(enabled)
+
+    def toggle_playback(self):
+        if self.flipbook.is_playing():
+            self.flipbook.stop()
+            return
+
+        if self.preview_sequence is None:
+            return
+        try:
+            fps = float(self.frame_rate_cb.currentText())
+        except ValueError:
+            fps = 24.0
+        self.play_btn.setText("Stop")
+        self.flipbook.play(self.preview_sequence, fps, self.frame_slider.value())
+
+    def scrub_preview(self, index: int):
+        if self.preview_sequence is None:
+            return
+
+        if self.flipbook.is_playing():
+            self.flipbook.seek(index)
+            return
+
+        # Paused scrubbing goes through the thumbnail caches.
+        self.preview_path = self.preview_sequence.path(index)
+        self.playback_lb.setText(f"Frame {self.preview_sequence.frames[index]}")
+        image = self.thumbnails.request(self.preview_path)
+        if image is not None:
+            self.set_preview_image(self.preview_path, image)
+
+    def show_flipbook_frame(self, index: int, frame: int, image):
+        self.preview_img.setPixmap(QPixmap.fromImage(image))
+        self.frame_slider.blockSignals(True)
+        self.frame_slider.setValue(index)
+        self.frame_slider.blockSignals(False)
+        self.playback_lb.setText(f"Frame {frame}")
+
+    def show_playback_stats(self, stats: dict):
+        self.playback_lb.setText(
+            f"Frame {self.preview_sequence.frames[self.frame_slider.value()]}  "
+            f"{stats['fps']:.1f} fps  dropped {stats['dropped']}  "
+            f"buffered {stats['buffered']}"
+        )
+
+    def set_layers(self, path: str):
+        # Start from the default entry, the layer list arrives from a worker.
+        self.layer_cb.clear()
+        self.layer_cb.addItem("RGBA", None)
+        self.layer_cb.setEnabled(False)
+        self.layer_path = path
+        if not path.lower().endswith(".exr"):
+            return
+
+        layers = self.thumbnails.request_layers(path)
+        if layers is not None:
+            self.show_layers(path, layers)
+
+    def show_layers(self, path: str, layers: list):
+        if path != self.layer_path or len(layers) < 2:
+            return
+
+        self.layer_cb.clear()
+        for layer, label in layers:
+            self.layer_cb.addItem(label, layer)
+        self.layer_cb.setEnabled(True)
+
+        current = self.layer_node.layer if self.layer_node else None
+        for index, (layer, _) in enumerate(layers):
+            if layer == current:
+                self.layer_cb.setCurrentIndex(index)
+                break
+
+    def store_layer(self, index: int):
+        if self.layer_node is None:
+            return
+        layer = self.current_layer()
+        if layer == exr_layers.DEFAULT_LAYER:
+            layer = None
+        self.file_tree.tree_model.set_layer(self.layer_node, layer)
+
+    def current_layer(self) -> tuple[int, str] | None:
+        # Qt may hand the stored tuple back as a list.
+        layer = self.layer_cb.currentData()
+        return tuple(layer) if layer else None
+
+    def set_scan_visible(self, visible: bool):
+        self.scan_progress_bar.setVisible(visible)
+        self.scan_lb.setVisible(visible)
+        self.scan_cancel_btn.setVisible(visible)
+        if visible:
+            self.scan_lb.setText("Scanning...")
+
+    def update_scan_progress(self, dir_count: int, item_count: int):
+        self.scan_lb.setText(f"{dir_count} folder(s), {item_count} item(s)")
+
+    def add_forwarded_paths(self, paths: list[str]):
+        # Paths from another launch of run_converter, see instance_server.
+        if paths:
+            self.file_tree.populate_tree(paths, self)
+        if self.isMinimized():
+            self.showNormal()
+        self.raise_()
+        self.activateWindow()
+
+    def closeEvent(self, event):
+        self.flipbook.shutdown()
+        self.file_tree.stop_workers()
+        super().closeEvent(event)
+
+    def set_progress_visible(self, visible: bool):
+        self.progress_bar.setVisible(visible)
+        self.progress_lb.setVisible(visible)
+        self.cancel_btn.setVisible(visible)
+        self.convert_btn.setDisabled(visible)
 
     def create_menu_button_layout(self, button, button_text):
 
@@ -332,11 +557,21 @@ class ConverterUi(QWidget):
         left_layout = QGridLayout()
         left_layout.addLayout(menu_layout, 0, 0, 1, 3)
         left_layout.addWidget(self.file_tree, 2, 0, 1, 3)
+        scan_layout = QHBoxLayout()
+        scan_layout.addWidget(self.scan_progress_bar, 1)
+        scan_layout.addWidget(self.scan_lb)
+        scan_layout.addWidget(self.scan_cancel_btn)
+        left_layout.addLayout(scan_layout, 3, 0, 1, 3)
         
         # right side layout
         # preview image layout
         prv_img_layout = QVBoxLayout()
         prv_img_layout.addWidget(self.preview_img)
+        playback_layout = QHBoxLayout()
+        playback_layout.addWidget(self.play_btn)
+        playback_layout.addWidget(self.frame_slider)
+        prv_img_layout.addLayout(playback_layout)
+        prv_img_layout.addWidget(self.playback_lb)
         prv_img_grbx = QGroupBox()
         prv_img_grbx.setLayout(prv_img_layout)
         prv_img_grbx.setMinimumHeight(200)
@@ -381,7 +616,13 @@ class ConverterUi(QWidget):
         convert_layout.addWidget(self.frame_rate_cb, 3, 1)
         convert_layout.addWidget(self.codec_lb, 4, 0)
         convert_layout.addWidget(self.codec_cb, 4, 1)
-        convert_layout.addLayout(resize_layout, 5, 0, 1, 2)
+        convert_layout.addWidget(self.layer_lb, 5, 0)
+        convert_layout.addWidget(self.layer_cb, 5, 1)
+        convert_layout.addLayout(resize_layout, 6, 0, 1, 2)
+        convert_layout.addWidget(self.separate_jobs_chb, 7, 0, 1, 2)
+        convert_layout.addWidget(self.segment_encode_chb, 8, 0, 1, 2)
+        convert_layout.addWidget(self.raw_feed_chb, 9, 0, 1, 2)
+        convert_layout.addWidget(self.native_image_chb, 10, 0, 1, 2)
         convert_grbx = QGroupBox()
         convert_grbx.setLayout(convert_layout)
 
@@ -390,6 +631,10 @@ class ConverterUi(QWidget):
         save_path_layout.addWidget(self.save_path_le)
         save_path_layout.addWidget(self.save_dir_btn)
 
+        progress_layout = QHBoxLayout()
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_btn)
+
         right_layout = QVBoxLayout()
         right_layout.addWidget(prv_grbx)
         right_layout.addWidget(convert_grbx)
@@ -397,6 +642,8 @@ class ConverterUi(QWidget):
         right_layout.addLayout(save_path_layout)
         right_layout.addSpacing(10) 
         right_layout.addWidget(self.convert_btn)
+        right_layout.addLayout(progress_layout)
+        right_layout.addWidget(self.progress_lb)
         right_layout.addStretch()
 
         # Combine left and right layouts
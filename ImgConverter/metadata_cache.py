@@ -0,0 +1,174 @@
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+
+import converter_constants as constants
+from HANLib import init_logger
+
+# Set Logger
+log_name = "metadata_cache"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# log_dir only expands on Windows, the cache must not land in the working
+# directory elsewhere.
+CACHE_PATH = str(Path.home() / "Logs" / "ImgConverter" / "metadata_cache.db")
+
+# SQLite limits the number of bound parameters per statement.
+QUERY_CHUNK = 500
+
+
+class MetadataCache():
+    """Probe results by path, shared by every process of the user.
+
+    Query errors such as a locked database are logged and treated as a
+    cache miss, the cache is never the reason a scan fails.
+    """
+    def __init__(self, db_path=CACHE_PATH, max_entries=None):
+        self.db_path = db_path
+        self.max_entries = max_entries or constants.METADATA_CACHE_MAX_ENTRIES
+        self.lock = threading.Lock()
+
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.create_table()
+        # Upper bound of the row count, replaced rows are counted too. The
+        # real count is only queried once this passes max_entries.
+        self.count = self.conn.execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+
+    def create_table(self):
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS frames ("
+                "path TEXT PRIMARY KEY, "
+                "size INTEGER NOT NULL, "
+                "mtime_ns INTEGER NOT NULL, "
+                "width INTEGER, "
+                "height INTEGER, "
+                "format TEXT, "
+                "last_access REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS frames_last_access "
+                "ON frames (last_access)"
+            )
+
+    def get_many(self, stats: dict) -> dict:
+        """Return cached records for paths whose size and mtime still match.
+
+        stats maps a path to its os.stat_result.
+        """
+        if not stats:
+            return {}
+
+        try:
+            return self._get_many(stats)
+        except sqlite3.Error as e:
+            LOGGER.warning(f"Metadata cache read failed: {e}")
+            return {}
+
+    def _get_many(self, stats: dict) -> dict:
+
+        records = {}
+        paths = list(stats)
+        with self.lock:
+            for i in range(0, len(paths), QUERY_CHUNK):
+                chunk = paths[i:i + QUERY_CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    "SELECT path, size, mtime_ns, width, height, format "
+                    f"FROM frames WHERE path IN ({marks})", chunk
+                ).fetchall()
+
+                for path, size, mtime_ns, width, height, format in rows:
+                    stat = stats[path]
+                    if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                        continue
+                    records[path] = {
+                        "width": width,
+                        "height": height,
+                        "file_size": size,
+                        "format": format,
+                    }
+
+            if records:
+                now = time.time()
+                with self.conn:
+                    self.conn.executemany(
+                        "UPDATE frames SET last_access = ? WHERE path = ?",
+                        [(now, path) for path in records]
+                    )
+
+        return records
+
+    def put_many(self, records: dict, stats: dict):
+        """Store probed records, keyed by path, with the stat they were read at."""
+        if not records:
+            return
+
+        now = time.time()
+        rows = []
+        for path, record in records.items():
+            stat = stats[path]
+            rows.append((
+                path, stat.st_size, stat.st_mtime_ns, record["width"],
+                record["height"], record["format"], now
+            ))
+
+        try:
+            with self.lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO frames "
+                    "(path, size, mtime_ns, width, height, format, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.count += len(rows)
+                if self.count > self.max_entries:
+                    self.evict()
+        except sqlite3.Error as e:
+            LOGGER.warning(f"Metadata cache write skipped: {e}")
+
+    def evict(self):
+        self.count = self.conn.execute("SELECT COUNT(*) FROM frames").fetchone()[0]
+        excess = self.count - self.max_entries
+        if excess <= 0:
+            return
+
+        self.conn.execute(
+            "DELETE FROM frames WHERE path IN ("
+            "SELECT path FROM frames ORDER BY last_access LIMIT ?)", (excess,)
+        )
+        self.count -= excess
+        LOGGER.info(f"Evicted {excess} entries from metadata cache.")
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM frames")
+            self.count = 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+_CACHE = None
+
+def get_cache() -> MetadataCache | None:
+    global _CACHE
+
+    if not constants.METADATA_CACHE_ENABLED:
+        return None
+
+    if _CACHE is None:
+        try:
+            _CACHE = MetadataCache()
+        except sqlite3.Error as e:
+            LOGGER.warning(f"Metadata cache disabled: {e}")
+            constants.METADATA_CACHE_ENABLED = False
+            return None
+
+    return _CACHE
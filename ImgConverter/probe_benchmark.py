@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(os.path.dirname(__file__))
+
+import converter_constants as constants
+import file_handler as handler
+import image_header
+
+
+def collect_files(paths: list[str], limit=None) -> list[str]:
+
+    files = []
+    for path in paths:
+        if os.path.isfile(path):
+            files.append(path)
+            continue
+        for root, _, names in os.walk(path):
+            for name in sorted(names):
+                if Path(name).suffix.lower() in constants.INPUT_IMAGE_FORMAT:
+                    files.append(os.path.join(root, name))
+    return files[:limit] if limit else files
+
+def time_probe(probe, files: list[str], repeat: int) -> tuple[float, list]:
+
+    results = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = [probe(path) for path in files]
+    elapsed = time.perf_counter() - start
+    return elapsed / max(1, repeat * len(files)), results
+
+def run_benchmark(files: list[str], repeat=3):
+
+    # One untimed pass so both probes read from a warm file cache.
+    for path in files:
+        image_header.read_dimensions(path)
+
+    header_time, header_results = time_probe(image_header.read_dimensions, files, repeat)
+    oiio_time, oiio_results = time_probe(handler._get_oiio_dimensions, files, repeat)
+
+    mismatches = [
+        (path, fast, slow)
+        for path, fast, slow in zip(files, header_results, oiio_results)
+        if fast is not None and fast != slow
+    ]
+    fallbacks = sum(1 for result in header_results if result is None)
+
+    print(f"Files: {len(files)}  Repeat: {repeat}")
+    print(f"Header parser: {header_time * 1e6:10.1f} us/file")
+    print(f"OpenImageIO:   {oiio_time * 1e6:10.1f} us/file")
+    if header_time:
+        print(f"Speed up:      {oiio_time / header_time:10.1f}x")
+    print(f"OIIO fallbacks: {fallbacks}")
+    print(f"Mismatches: {len(mismatches)}")
+    for path, fast, slow in mismatches[:20]:
+        print(f"  {path}: header {fast} oiio {slow}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare per-file dimension probe latency against OpenImageIO."
+    )
+    parser.add_argument("paths", nargs="+", help="Image files or directories.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=None)
+    args = parser.parse_args()
+
+    files = collect_files(args.paths, args.limit)
+    if not files:
+        sys.exit("No images found.")
+    run_benchmark(files, args.repeat)
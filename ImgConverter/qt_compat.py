@@ -1,30 +1,40 @@
 try:
 
     from PySide6.QtCore import ( 
-        Qt, QSize, QItemSelectionModel, Signal, QTimer, QRect
+        Qt, QSize, QItemSelectionModel, Signal, QTimer, QRect,
+        QAbstractItemModel, QModelIndex, QMimeData, QThread, QObject,
+        QRunnable, QThreadPool
+    )
+    from PySide6.QtGui import (
+        QIcon, QFontDatabase, QFont, QPixmap, QPainter, QImage, QColor
     )
-    from PySide6.QtGui import QIcon, QFontDatabase, QFont, QPixmap, QPainter
     from PySide6.QtWidgets import (
         QWidget, QLabel, QPushButton, QSizePolicy, QComboBox, QSpacerItem, 
         QFrame, QHBoxLayout, QVBoxLayout, QGridLayout, QGroupBox, 
         QApplication, QCheckBox, QTableWidget, QLineEdit, QSpinBox, 
         QAbstractItemView, QTableWidgetItem, QFileDialog, QMessageBox, 
         QHeaderView, QDoubleSpinBox, QStyleOptionButton, QStyle, QTreeWidget,
-        QTreeWidgetItem
+        QTreeWidgetItem, QTreeView, QProgressBar, QSlider
     )
+    from PySide6.QtNetwork import QLocalServer, QLocalSocket
     
 except ImportError:
     from PySide2.QtCore import (
-        Qt, QSize, QItemSelectionModel, Signal, QTimer, QRect
+        Qt, QSize, QItemSelectionModel, Signal, QTimer, QRect,
+        QAbstractItemModel, QModelIndex, QMimeData, QThread, QObject,
+        QRunnable, QThreadPool
+    )
+    from PySide2.QtGui import (
+        QIcon, QFontDatabase, QFont, QPixmap, QPainter, QImage, QColor
     )
-    from PySide2.QtGui import QIcon, QFontDatabase, QFont, QPixmap, QPainter
     from PySide2.QtWidgets import (
         QWidget, QLabel, QPushButton, QSizePolicy, QComboBox, QSpacerItem, 
         QFrame, QHBoxLayout, QVBoxLayout, QGridLayout, QGroupBox, 
         QApplication, QCheckBox, QTableWidget, QLineEdit, QSpinBox, 
         QAbstractItemView, QTableWidgetItem, QFileDialog, QMessageBox, 
         QHeaderView, QDoubleSpinBox, QStyleOptionButton, QStyle, QTreeWidget,
-        QTreeWidgetItem
+        QTreeWidgetItem, QTreeView, QProgressBar, QSlider
     )
+    from PySide2.QtNetwork import QLocalServer, QLocalSocket
 
 import qdarktheme
\ No newline at end of file
@@ -3,23 +3,57 @@ import sys
 
 sys.path.append(os.path.dirname(__file__))
 
-from qt_compat import QApplication
-from Widgets import push_button
+# Arguments that switch to a headless mode, Qt is never imported.
+BATCH_FLAGS = ("--batch", "--headless")
+WATCH_FLAG = "--watch"
+FARM_FLAG = "--farm"
+# Opens another window instead of handing the paths to the running one.
+NEW_WINDOW_FLAG = "--new-window"
 
 def parse_file_args(raw_args):
+    # The file browser passes every selected path in one argument.
+    if len(raw_args) > 1:
+        return raw_args
     combined = raw_args[0]
     return combined.split()
 
 def main():
-    app = QApplication(sys.argv)
-
     raw_args = sys.argv[1:]
 
+    if raw_args and raw_args[0] in BATCH_FLAGS:
+        import batch_converter
+        sys.exit(batch_converter.main(raw_args[1:]))
+    if raw_args and raw_args[0] == WATCH_FLAG:
+        import watch_folder
+        sys.exit(watch_folder.main(raw_args[1:]))
+    if raw_args and raw_args[0] == FARM_FLAG:
+        import farm_queue
+        sys.exit(farm_queue.main(raw_args[1:]))
+
+    new_window = NEW_WINDOW_FLAG in raw_args
+    raw_args = [arg for arg in raw_args if arg != NEW_WINDOW_FLAG]
     file_paths = parse_file_args(raw_args) if raw_args else []
 
+    # Only the socket module is loaded up to here, a running window takes
+    # the paths without this launch paying for Qt and OpenImageIO.
+    import single_instance
+    if not new_window and single_instance.send_paths(file_paths):
+        sys.exit(0)
+
+    from qt_compat import QApplication
+    from Widgets import push_button
+    from instance_server import InstanceServer
+
+    app = QApplication(sys.argv)
+
     window = push_button.ButtonEventHandler(file_paths)
     window.show()
 
+    if not new_window:
+        server = InstanceServer(window)
+        server.paths_received.connect(window.add_forwarded_paths)
+        server.listen()
+
     sys.exit(app.exec())
     
 
@@ -0,0 +1,83 @@
+import os
+import time
+from pathlib import Path
+
+from qt_compat import QThread, Signal
+import converter_constants as constants
+import file_handler as handler
+from HANLib import init_logger
+
+# Set Logger
+log_name = "scan_worker"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class ScanWorker(QThread):
+    """Walk dropped paths off the UI thread and hand results over in batches.
+
+    Directory results are merged until SCAN_BATCH_ITEMS items are pending or
+    SCAN_BATCH_INTERVAL seconds passed, so the model inserts rows in a few
+    large blocks instead of one per folder.
+    """
+    batch_ready = Signal(object, object)
+    progress = Signal(int, int)
+    scan_finished = Signal(bool)
+
+    def __init__(self, paths: list[str], parent=None):
+        super().__init__(parent)
+        self.paths = paths
+        self.cancelled = False
+        self.dir_count = 0
+        self.item_count = 0
+
+    def run(self):
+        start_time = time.monotonic()
+        sequences, images = {}, []
+        last_emit = time.monotonic()
+
+        try:
+            for seq_info, none_seq_info in handler.iter_paths_info(self.paths):
+                if self.cancelled:
+                    break
+
+                self.dir_count += 1
+                if seq_info:
+                    sequences.update(seq_info["sequence"])
+                if none_seq_info:
+                    images.extend(none_seq_info["none_sequence"])
+
+                pending = len(sequences) + len(images)
+                now = time.monotonic()
+                if (
+                    pending >= constants.SCAN_BATCH_ITEMS
+                    or now - last_emit >= constants.SCAN_BATCH_INTERVAL
+                ):
+                    self.emit_batch(sequences, images)
+                    sequences, images = {}, []
+                    last_emit = now
+        except Exception as e:
+            # Whatever broke the scan, the tree waits for scan_finished.
+            LOGGER.error(f"Scan failed: {type(e).__name__}: {e}")
+        finally:
+            if not self.cancelled:
+                self.emit_batch(sequences, images)
+            LOGGER.info(
+                f"Scanned {self.dir_count} folder(s), {self.item_count} item(s) in "
+                f"{time.monotonic() - start_time:.2f}s. cancelled={self.cancelled}"
+            )
+            self.scan_finished.emit(self.cancelled)
+
+    def emit_batch(self, sequences: dict, images: list):
+        if not sequences and not images:
+            return
+        self.item_count += len(sequences) + len(images)
+        self.batch_ready.emit(
+            {"sequence": sequences} if sequences else None,
+            {"none_sequence": images} if images else None,
+        )
+        self.progress.emit(self.dir_count, self.item_count)
+
+    def cancel(self):
+        self.cancelled = True
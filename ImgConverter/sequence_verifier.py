@@ -0,0 +1,78 @@
+import os
+import threading
+from collections import deque
+from pathlib import Path
+
+from qt_compat import QThread, Signal
+import file_handler as handler
+from HANLib import init_logger
+
+# Set Logger
+log_name = "sequence_verifier"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class SequenceVerifier(QThread):
+    """Probe every frame of fast-scanned sequences in the background.
+
+    The records are handed back through verified and applied on the UI
+    thread, the worker never writes to a sequence the view is reading.
+    """
+    verified = Signal(object, list)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.active = False
+        self.cancelled = False
+
+    def add(self, sequence):
+        with self.lock:
+            self.queue.append(sequence)
+            start = not self.active
+            self.active = True
+
+        if start:
+            # A worker that just found the queue empty may still be exiting.
+            self.wait()
+            self.cancelled = False
+            self.start(QThread.LowPriority)
+
+    def run(self):
+        try:
+            self.verify_queue()
+        except Exception as e:
+            # Let the next add() start a new worker.
+            LOGGER.error(f"Verification stopped: {type(e).__name__}: {e}")
+            with self.lock:
+                self.active = False
+
+    def verify_queue(self):
+        while not self.cancelled:
+            with self.lock:
+                if not self.queue:
+                    self.active = False
+                    return
+                sequence = self.queue.popleft()
+
+            try:
+                records = handler.probe_sequence(
+                    sequence, is_cancelled=lambda: self.cancelled
+                )
+            except Exception as e:
+                LOGGER.warning(
+                    f"Failed to verify {sequence.padding_path()}: {type(e).__name__}: {e}"
+                )
+                continue
+            if records is None:
+                return
+            self.verified.emit(sequence, records)
+
+    def cancel(self):
+        with self.lock:
+            self.queue.clear()
+            self.active = False
+        self.cancelled = True
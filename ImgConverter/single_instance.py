@@ -0,0 +1,105 @@
+import os
+import sys
+import json
+import socket
+import getpass
+import tempfile
+import threading
+from pathlib import Path
+
+from HANLib import init_logger
+
+# Set Logger
+log_name = "single_instance"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+# Seconds a second launch waits to reach the running window, and then for
+# its reply. The reply comes from the UI thread, which may be busy loading.
+CONNECT_TIMEOUT = 0.5
+REPLY_TIMEOUT = 5.0
+# Reply of the running window once it read the paths. The paths are only
+# loaded after the launch confirms with COMMIT, so a launch that gave up
+# waiting and opens its own window never shows them twice.
+ACK = b"ok\n"
+COMMIT = b"go\n"
+
+
+def get_server_name() -> str:
+    """Name the window listens on with QLocalServer.
+
+    A pipe name on Windows, an absolute socket path elsewhere, so both
+    sides agree on it without asking Qt.
+    """
+    name = f"ImgConverter-{getpass.getuser()}"
+    if sys.platform == "win32":
+        return name
+    return os.path.join(tempfile.gettempdir(), f"{name}.sock")
+
+def send_paths(paths: list[str]) -> bool:
+    """Hand paths to a running window, False if there is none.
+
+    Runs before Qt is imported so the second launch exits right away.
+    """
+    message = json.dumps({"paths": [os.path.abspath(p) for p in paths]}) + "\n"
+    message = message.encode("utf-8")
+    name = get_server_name()
+    try:
+        if sys.platform == "win32":
+            sent = _send_pipe(name, message)
+        else:
+            sent = _send_socket(name, message)
+    except OSError as e:
+        LOGGER.info(f"No running window answered: {e}")
+        return False
+
+    if not sent:
+        LOGGER.warning("Running window did not take the paths.")
+        return False
+    LOGGER.info(f"Forwarded {len(paths)} path(s) to the running window.")
+    return True
+
+def _send_socket(name: str, message: bytes) -> bool:
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        sock.connect(name)
+        sock.settimeout(REPLY_TIMEOUT)
+        sock.sendall(message)
+        if sock.recv(len(ACK)) != ACK:
+            return False
+        sock.sendall(COMMIT)
+    return True
+
+def _send_pipe(name: str, message: bytes) -> bool:
+    # Opening and reading a named pipe have no timeout, a window that
+    # hangs would hang this launch too. The exchange runs in a thread
+    # that is given up on after REPLY_TIMEOUT, the lock makes sure it
+    # never confirms once this side gave up.
+    result = {}
+    lock = threading.Lock()
+
+    def exchange():
+        try:
+            with open(rf"\\.\pipe\{name}", "r+b", buffering=0) as pipe:
+                pipe.write(message)
+                reply = pipe.read(len(ACK))
+                with lock:
+                    if reply != ACK or result.get("given_up"):
+                        return
+                    pipe.write(COMMIT)
+                    result["sent"] = True
+        except OSError as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=exchange, daemon=True)
+    thread.start()
+    thread.join(REPLY_TIMEOUT)
+    with lock:
+        if result.get("sent"):
+            return True
+        result["given_up"] = True
+    if "error" in result:
+        raise result["error"]
+    return False
@@ -31,12 +31,11 @@ class SlateHandler():
         start_frame, end_frame, frame_range = self.get_frame_data()
 
     def get_frame_data(self):
-        seq_paths, non_seq_paths = handler.parse_path_by_type(self.checked_items)
-        frames = handler.get_frames(seq_paths)
+        sequences, non_seq_paths = handler.parse_path_by_type(self.checked_items)
 
-        start_frame = int(min(frames)) if frames else None
-        end_frame = int(max(frames)) if frames else None
-        duration = (end_frame - start_frame + 1) if frames else None
-        frame_range = f"{start_frame}-{end_frame} ({duration})" if frames else "N/A"
+        start_frame = min(seq.start for seq in sequences) if sequences else None
+        end_frame = max(seq.end for seq in sequences) if sequences else None
+        duration = (end_frame - start_frame + 1) if sequences else None
+        frame_range = f"{start_frame}-{end_frame} ({duration})" if sequences else "N/A"
 
         return start_frame, end_frame, frame_range
\ No newline at end of file
@@ -0,0 +1,222 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import OpenImageIO as oiio
+
+import exr_layers
+from qt_compat import QObject, QRunnable, QThreadPool, QImage, Signal
+import converter_constants as constants
+from HANLib import init_logger
+
+# Set Logger
+log_name = "thumbnail_service"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+THUMBNAIL_DIR = str(Path(log_dir) / "thumbnails")
+
+
+class ThumbnailTask(QRunnable):
+    def __init__(self, service, path: str):
+        super().__init__()
+        self.service = service
+        self.path = path
+
+    def run(self):
+        key = self.service.cache_key(self.path)
+        if key is None:
+            self.service.finish(self.path, QImage())
+            return
+
+        image = self.service.load_disk_cache(key)
+        if image is None:
+            try:
+                image = decode_thumbnail(self.path, *self.service.size)
+            except RuntimeError as e:
+                LOGGER.warning(str(e))
+                image = QImage()
+            if not image.isNull():
+                self.service.save_disk_cache(key, image)
+        self.service.finish(self.path, image)
+
+
+class LayerTask(QRunnable):
+    def __init__(self, service, path: str):
+        super().__init__()
+        self.service = service
+        self.path = path
+
+    def run(self):
+        try:
+            layers = exr_layers.list_layers(self.path)
+        except RuntimeError as e:
+            LOGGER.warning(str(e))
+            layers = []
+        self.service.finish_layers(self.path, layers)
+
+
+class ThumbnailService(QObject):
+    """Decode preview thumbnails off the UI thread.
+
+    Thumbnails are kept in a small in-memory LRU keyed by path and as PNG
+    files under the log directory, keyed by path, size and mtime so edited
+    frames refresh in the next session. The UI thread never touches the
+    disk, stats and cache files are handled by the pool.
+    EXR layer lists are read on a separate pool and kept per path.
+    """
+    thumbnail_ready = Signal(str, QImage)
+    layers_ready = Signal(str, list)
+
+    def __init__(self, width=300, height=200, parent=None):
+        super().__init__(parent)
+        self.size = (width, height)
+        self.memory = OrderedDict()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(constants.THUMBNAIL_WORKERS)
+        # Own pool, so clearing queued thumbnails never drops a layer read.
+        self.layers = {}
+        self.layer_pool = QThreadPool(self)
+        self.layer_pool.setMaxThreadCount(1)
+        Path(THUMBNAIL_DIR).mkdir(parents=True, exist_ok=True)
+        threading.Thread(target=self.prune_disk_cache, daemon=True).start()
+
+    def request(self, path: str) -> QImage | None:
+        """Return the cached thumbnail or queue a decode and return None."""
+        key = os.path.normcase(path)
+        with self.lock:
+            image = self.memory.get(key)
+            if image is not None:
+                self.memory.move_to_end(key)
+                return image
+            if key in self.pending:
+                return None
+
+        # Drop decodes queued for frames the user already clicked past.
+        self.pool.clear()
+        with self.lock:
+            self.pending = {key}
+        self.pool.start(ThumbnailTask(self, path))
+        return None
+
+    def finish(self, path: str, image: QImage):
+        key = os.path.normcase(path)
+        with self.lock:
+            self.pending.discard(key)
+            if not image.isNull():
+                self.memory[key] = image
+                self.memory.move_to_end(key)
+                while len(self.memory) > constants.THUMBNAIL_MEMORY_ENTRIES:
+                    self.memory.popitem(last=False)
+        self.thumbnail_ready.emit(path, image)
+
+    def request_layers(self, path: str) -> list | None:
+        """Return the cached layers of path or queue a read and return None."""
+        with self.lock:
+            if path in self.layers:
+                return self.layers[path]
+
+        self.layer_pool.clear()
+        self.layer_pool.start(LayerTask(self, path))
+        return None
+
+    def finish_layers(self, path: str, layers: list):
+        with self.lock:
+            self.layers[path] = layers
+        self.layers_ready.emit(path, layers)
+
+    def cache_key(self, path: str) -> str | None:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        text = f"{os.path.normcase(path)}|{stat.st_size}|{stat.st_mtime_ns}|{self.size}"
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def load_disk_cache(self, key: str) -> QImage | None:
+        cache_path = str(Path(THUMBNAIL_DIR) / f"{key}.png")
+        if not os.path.exists(cache_path):
+            return None
+        image = QImage(cache_path)
+        return None if image.isNull() else image
+
+    def save_disk_cache(self, key: str, image: QImage):
+        cache_path = Path(THUMBNAIL_DIR) / f"{key}.png"
+        partial_path = cache_path.with_suffix(".partial.png")
+        if image.save(str(partial_path), "PNG"):
+            os.replace(partial_path, cache_path)
+
+    def prune_disk_cache(self):
+        try:
+            entries = list(os.scandir(THUMBNAIL_DIR))
+        except OSError:
+            return
+
+        excess = len(entries) - constants.THUMBNAIL_DISK_ENTRIES
+        if excess <= 0:
+            return
+
+        # Runs next to the decodes, a file may be replaced while sorting.
+        entries.sort(key=_entry_mtime)
+        for entry in entries[:excess]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        LOGGER.info(f"Removed {excess} old thumbnails.")
+
+
+def _entry_mtime(entry) -> float:
+
+    try:
+        return entry.stat().st_mtime
+    except OSError:
+        return 0.0
+
+def decode_thumbnail(path: str, width: int, height: int) -> QImage:
+
+    img = oiio.ImageInput.open(str(path))
+    if not img:
+        raise RuntimeError(f"Failed to open image: {path} {oiio.geterror()}")
+
+    # Use the smallest MIP level that still covers the thumbnail, tiled
+    # EXRs and TIFFs then skip reading the full resolution.
+    miplevel = 0
+    while img.seek_subimage(0, miplevel + 1):
+        spec = img.spec()
+        if spec.width < width and spec.height < height:
+            break
+        miplevel += 1
+    img.close()
+
+    buf = oiio.ImageBuf(str(path), 0, miplevel)
+    if buf.has_error:
+        raise RuntimeError(f"Failed to read image: {path} {buf.geterror()}")
+
+    channels = (0, 1, 2) if buf.nchannels >= 3 else (0, 0, 0)
+    buf = oiio.ImageBufAlgo.channels(buf, channels)
+
+    spec = buf.spec()
+    scale = min(width / spec.width, height / spec.height, 1.0)
+    thumb_width = max(1, int(spec.width * scale))
+    thumb_height = max(1, int(spec.height * scale))
+    buf = oiio.ImageBufAlgo.resize(
+        buf, roi=oiio.ROI(0, thumb_width, 0, thumb_height, 0, 1, 0, 3)
+    )
+
+    # Scene linear float images are shown with the sRGB transfer curve.
+    if spec.format.basetype in (oiio.HALF, oiio.FLOAT, oiio.DOUBLE):
+        buf = oiio.ImageBufAlgo.colorconvert(buf, "linear", "sRGB")
+
+    pixels = buf.get_pixels(oiio.UINT8)
+    if pixels is None:
+        raise RuntimeError(f"Failed to read image: {path} {buf.geterror()}")
+
+    data = pixels.tobytes()
+    image = QImage(data, thumb_width, thumb_height, thumb_width * 3, QImage.Format_RGB888)
+    return image.copy()
@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.append(os.path.dirname(__file__))
+
+import converter_constants as constants
+import batch_converter
+import ffmpeg_handler as ffmpeg
+from frame_sequence import group_sequences
+from HANLib import init_logger
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+# Set Logger
+log_name = "watch_folder"
+log_dir = os.path.expanduser(r"~\Logs\ImgConverter")
+log_path = str(Path(log_dir) / f"{log_name}.log")
+LOGGER = init_logger.Logger(log_name, log_path)
+
+
+class ChangeHandler(FileSystemEventHandler):
+    """Turn watchdog events into dirty folders of a FolderWatcher."""
+    def __init__(self, watcher):
+        super().__init__()
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if not path:
+                continue
+            if event.is_directory:
+                self.watcher.mark_dirty(path)
+            self.watcher.mark_dirty(os.path.dirname(path))
+
+
+class FolderWatcher():
+    """Find finished sequences under root folders and hand them to on_ready.
+
+    Changes come from watchdog when it is installed, otherwise from one
+    stat per folder and poll. Only changed folders are listed again, and
+    they are relisted until their sequences stopped changing. A sequence
+    is ready once its frame count, sizes and mtimes held still for settle
+    seconds and it has no missing frames. Sequences that already exist
+    at start are only handed over with initial, or once they change.
+    """
+    def __init__(
+            self, roots: list[str], on_ready, settle=None, poll_interval=None,
+            use_watchdog=True, initial=False
+    ):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.on_ready = on_ready
+        self.settle = settle if settle is not None else constants.WATCH_SETTLE_SECONDS
+        self.poll_interval = poll_interval or constants.WATCH_POLL_INTERVAL
+        self.use_watchdog = use_watchdog and Observer is not None
+        self.initial = initial
+        # True while start() lists the folders that exist before watching.
+        self.indexing = False
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.observer = None
+        # Polling only: folder -> mtime_ns of its last listing.
+        self.dir_mtimes = {}
+        # (st_dev, st_ino) -> the folder path it is watched under, links
+        # back into a watched folder are not followed again.
+        self.dir_ids = {}
+        # Folders to list on the next tick.
+        self.dirty = set()
+        # folder -> {padding path: (signature, monotonic time it was first seen)}
+        self.listings = {}
+        # padding path -> signature handed to on_ready, so a finished
+        # sequence is converted once unless its frames change again.
+        self.done = {}
+        self.gap_warned = set()
+
+    def start(self):
+        self.indexing = True
+        try:
+            for root in self.roots:
+                self.index_tree(root)
+        finally:
+            self.indexing = False
+
+        if self.use_watchdog:
+            self.observer = Observer()
+            handler = ChangeHandler(self)
+            for root in self.roots:
+                self.observer.schedule(handler, root, recursive=True)
+            self.observer.start()
+        LOGGER.info(
+            f"Watching {len(self.dir_mtimes)} folder(s) under {self.roots}, "
+            f"{'watchdog' if self.use_watchdog else 'polling'}."
+        )
+
+    def run(self):
+        self.start()
+        try:
+            while not self.stop_event.wait(self.poll_interval):
+                self.tick()
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.stop_event.set()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+            self.observer = None
+
+    def index_tree(self, root: str):
+        # Every folder is listed once up front, after that only on changes.
+        stack = [root]
+        while stack:
+            dir = stack.pop()
+            sub_dirs = self.list_dir(dir)
+            if sub_dirs is not None:
+                stack.extend(sub_dirs)
+
+    def mark_dirty(self, dir: str):
+        with self.lock:
+            self.dirty.add(dir)
+
+    def tick(self):
+        if not self.use_watchdog:
+            self.poll_mtimes()
+
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+
+        for dir in dirty:
+            sub_dirs = self.list_dir(dir)
+            # A new folder may already hold frames, or more folders.
+            for sub_dir in sub_dirs or []:
+                if sub_dir not in self.listings:
+                    self.index_tree(sub_dir)
+
+    def poll_mtimes(self):
+        for dir, mtime in list(self.dir_mtimes.items()):
+            try:
+                current = os.stat(dir).st_mtime_ns
+            except OSError:
+                self.forget_dir(dir)
+                continue
+            if current != mtime:
+                self.mark_dirty(dir)
+
+    def forget_dir(self, dir: str):
+        self.dir_mtimes.pop(dir, None)
+        self.listings.pop(dir, None)
+        for dir_id, path in list(self.dir_ids.items()):
+            if path == dir:
+                del self.dir_ids[dir_id]
+
+    def list_dir(self, dir: str):
+        """List dir, update its sequences and return its sub folders."""
+        paths, sub_dirs, stats = [], [], {}
+        try:
+            stat = os.stat(dir)
+            if self.dir_ids.setdefault((stat.st_dev, stat.st_ino), dir) != dir:
+                return []
+            mtime = stat.st_mtime_ns
+            with os.scandir(dir) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        sub_dirs.append(entry.path)
+                    elif (
+                        entry.is_file()
+                        and os.path.splitext(entry.name)[1].lower() in constants.INPUT_IMAGE_FORMAT
+                    ):
+                        paths.append(entry.path)
+                        stats[entry.path] = entry.stat()
+        except OSError:
+            self.forget_dir(dir)
+            return None
+
+        self.dir_mtimes[dir] = mtime
+        sequences, _ = group_sequences(paths)
+        if self.update_sequences(dir, sequences, stats):
+            # Something is still being written, look again next tick.
+            self.mark_dirty(dir)
+        return sub_dirs
+
+    def update_sequences(self, dir: str, sequences: dict, stats: dict) -> bool:
+        """Hand over settled sequences, return True while any is unsettled."""
+        now = time.monotonic()
+        previous = self.listings.get(dir, {})
+        listing = {}
+        unsettled = False
+
+        for padding_path, sequence in sequences.items():
+            if len(sequence) < constants.WATCH_MIN_FRAMES:
+                continue
+
+            file_stats = [stats[path] for path in sequence.paths()]
+            signature = (
+                len(sequence),
+                sum(stat.st_size for stat in file_stats),
+                max(stat.st_mtime_ns for stat in file_stats),
+            )
+            old_signature, since = previous.get(padding_path, (None, now))
+            if signature != old_signature:
+                since = now
+            listing[padding_path] = (signature, since)
+
+            if self.indexing and not self.initial:
+                # Already there before the watch, also covers the outputs
+                # of an earlier run. A later change converts it again.
+                self.done[padding_path] = signature
+                continue
+            if self.done.get(padding_path) == signature:
+                continue
+            if now - since < self.settle:
+                unsettled = True
+                continue
+
+            gaps = sequence.gaps()
+            if gaps:
+                if padding_path not in self.gap_warned:
+                    self.gap_warned.add(padding_path)
+                    LOGGER.warning(f"Waiting for missing frames: {padding_path}")
+                continue
+
+            self.gap_warned.discard(padding_path)
+            self.done[padding_path] = signature
+            LOGGER.info(f"Sequence complete: {padding_path} ({len(sequence)} frames)")
+            self.on_ready(sequence)
+
+        self.listings[dir] = listing
+        return unsettled
+
+
+class WatchDaemon():
+    """Convert every sequence a FolderWatcher reports with one job preset."""
+    def __init__(self, preset: dict, max_jobs=1, overwrite=False):
+        self.preset = preset
+        self.overwrite = overwrite
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_jobs))
+        self.lock = threading.Lock()
+        # Outputs written by this daemon, image outputs in a watched folder
+        # show up as new sequences and must not be converted again.
+        self.outputs = set()
+
+    def queue(self, sequence):
+        with self.lock:
+            if os.path.normcase(sequence.padding_path()) in self.outputs:
+                return
+        self.pool.submit(self.convert, sequence)
+
+    def convert(self, sequence):
+        try:
+            records = batch_converter.build_jobs({**self.preset, "inputs": list(sequence.paths())})
+        except (OSError, ValueError) as e:
+            LOGGER.error(f"Failed to build job for {sequence.padding_path()}: {e}")
+            return
+
+        for record in records:
+            output = record["output"]
+            with self.lock:
+                self.outputs.add(os.path.normcase(output))
+            if record["job"] and not self.overwrite and "%" not in output and os.path.exists(output):
+                LOGGER.info(f"Output exists, skipped: {output}")
+                ffmpeg.cleanup_job(record["job"])
+                record["job"] = None
+                record["error"] = "Output exists."
+
+        batch_converter.run_jobs(records, 1)
+        for record in records:
+            print(json.dumps(batch_converter.to_result(record)), flush=True)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(
+        prog="run_converter.py --watch",
+        description="Watch folders and convert sequences once they are complete. "
+                    "Prints a JSON result line per conversion to stdout."
+    )
+    parser.add_argument("roots", nargs="+", help="Folders to watch, sub folders included.")
+    parser.add_argument("--preset", help="JSON or YAML job spec used for every sequence.")
+    parser.add_argument("--format", default=None, choices=constants.OUTPUT_FORMAT)
+    parser.add_argument("--codec", default=None)
+    parser.add_argument("--output", default=None, help="Output folder, default next to the frames.")
+    parser.add_argument("--settle", type=float, default=constants.WATCH_SETTLE_SECONDS)
+    parser.add_argument("--interval", type=float, default=constants.WATCH_POLL_INTERVAL)
+    parser.add_argument("--jobs", type=int, default=1, help="Conversions run at once.")
+    parser.add_argument("--overwrite", action="store_true")
+    parser.add_argument(
+        "--initial", action="store_true",
+        help="Also convert the sequences that exist when the watch starts."
+    )
+    parser.add_argument("--polling", action="store_true", help="Poll even if watchdog is installed.")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+
+    args = parse_args(argv)
+    preset = {}
+    try:
+        if args.preset:
+            preset = batch_converter.load_spec(args.preset)[0]
+    except (OSError, ValueError, IndexError) as e:
+        LOGGER.error(f"Invalid preset: {e}")
+        print(json.dumps({"success": False, "error": str(e)}))
+        return 2
+
+    preset.pop("inputs", None)
+    for key in ("format", "codec", "output"):
+        if getattr(args, key):
+            preset[key] = getattr(args, key)
+    if preset.get("output"):
+        # Several sequences go to one place, always keep their own names.
+        preset["output"] = os.path.join(os.path.abspath(preset["output"]), "")
+
+    daemon = WatchDaemon(preset, args.jobs, args.overwrite)
+    watcher = FolderWatcher(
+        args.roots, daemon.queue, args.settle, args.interval, not args.polling,
+        args.initial
+    )
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        LOGGER.info("Watch stopped.")
+    finally:
+        watcher.stop()
+        daemon.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())